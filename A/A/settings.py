@@ -2,6 +2,7 @@ from pathlib import Path
 import os
 from dotenv import load_dotenv
 from celery.schedules import crontab
+from botocore.config import Config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -109,6 +110,30 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# PASSWORD_HASHER picks the hasher of new passwords: 'pbkdf2' (default), 'argon2' (needs
+# argon2-cffi) or 'scrypt'. The others stay listed so existing hashes keep verifying and
+# are upgraded on the next login.
+
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", 'pbkdf2')
+
+PASSWORD_HASHERS_BY_NAME = {
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+}
+
+PASSWORD_HASHERS = [PASSWORD_HASHERS_BY_NAME[PASSWORD_HASHER]] + [
+    hasher for hasher in [*PASSWORD_HASHERS_BY_NAME.values(),
+                          'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+                          'django.contrib.auth.hashers.BCryptSHA256PasswordHasher']
+    if hasher != PASSWORD_HASHERS_BY_NAME[PASSWORD_HASHER]
+]
+
+# Bulk user provisioning
+
+PROVISIONING_BATCH_SIZE = 1000
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
@@ -148,6 +173,45 @@ AWS_S3_REGION_NAME      = 'us-east-1'
 AWS_SERVICE_NAME        = 's3'  
 AWS_LOCAL_STORAGE       = f"{BASE_DIR}/aws/"
 
+# Shared by bucket.Bucket and the S3 storage backend: one pooled client per process.
+AWS_S3_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_S3_MAX_POOL_CONNECTIONS", 50))
+AWS_S3_CLIENT_CONFIG        = Config(
+    max_pool_connections = AWS_S3_MAX_POOL_CONNECTIONS,
+    tcp_keepalive        = True,
+    connect_timeout      = 5,
+    read_timeout         = 30,
+    retries              = {'max_attempts': 5, 'mode': 'standard'},
+)
+
+# QR codes
+
+QR_CODE_BASE_URL         = os.getenv("QR_CODE_BASE_URL", "https://TheWebSiteAddres/menu/")
+QR_CODE_BOX_SIZE         = 10
+QR_CODE_BORDER           = 4
+QR_CODE_ERROR_CORRECTION = 'M'
+QR_CODE_FORMAT           = 'PNG'
+QR_GC_CHUNK_SIZE         = 1000
+QR_GC_GRACE_PERIOD       = 60 * 60
+
+# Bulk item import and updates
+
+MENU_IMPORT_BATCH_SIZE     = 1000
+MENU_IMPORT_MAX_BATCH_SIZE = 5000
+MENU_IMPORT_MAX_ERRORS     = 100
+MENU_BULK_BATCH_SIZE       = 1000
+
+# Static menu snapshots
+# When enabled every menu change is exported to MENU_PUBLISH_BACKEND and QR codes point
+# at MENU_PUBLISH_BASE_URL (the CDN in front of the bucket) instead of this app.
+
+MENU_PUBLISH_ENABLED       = os.getenv("MENU_PUBLISH_ENABLED") == 'True'
+MENU_PUBLISH_BACKEND       = os.getenv("MENU_PUBLISH_BACKEND", 'menu.publishers.BucketMenuPublisher')
+MENU_PUBLISH_BASE_URL      = os.getenv("MENU_PUBLISH_BASE_URL", "")
+MENU_PUBLISH_PREFIX        = 'menus/'
+MENU_PUBLISH_HTML          = True
+MENU_PUBLISH_CACHE_CONTROL = 'public, max-age=60'
+MENU_PUBLISH_LOCATION      = f"{BASE_DIR}/published/"
+
 STORAGES = {
   "default": {
       "BACKEND": "storages.backends.s3.S3Storage",
@@ -157,6 +221,130 @@ STORAGES = {
   },
 }
 
+# Cache
+# Local memory unless REDIS_URL is set, so tests and development need no Redis server.
+
+REDIS_URL     = os.getenv("REDIS_URL")
+CACHE_BACKEND = ('django.core.cache.backends.redis.RedisCache' if REDIS_URL
+                 else 'django.core.cache.backends.locmem.LocMemCache')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'menu': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': REDIS_URL or 'menu',
+        'KEY_PREFIX': 'menu',
+    },
+    'sms': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': REDIS_URL or 'sms',
+        'KEY_PREFIX': 'sms',
+    },
+    'otp': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': REDIS_URL or 'otp',
+        'KEY_PREFIX': 'otp',
+    },
+    # Token revocations and server-side state of flows, which every process must see:
+    # the database cache (created by the accounts migrations) when there is no Redis.
+    'auth': {
+        'BACKEND': ('django.core.cache.backends.redis.RedisCache' if REDIS_URL
+                    else 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': REDIS_URL or 'auth_cache',
+        'KEY_PREFIX': 'auth',
+    },
+    'flows': {
+        'BACKEND': ('django.core.cache.backends.redis.RedisCache' if REDIS_URL
+                    else 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': REDIS_URL or 'flow_cache',
+        'KEY_PREFIX': 'flows',
+    },
+}
+
+# Menu documents are invalidated on write by bumping a version in the 'menu' cache. Only a
+# shared (Redis) cache makes that visible to every process; per-process caches keep them
+# briefly instead, so other workers serve an edited menu for at most a few seconds.
+MENU_CACHE_ALIAS   = 'menu'
+MENU_CACHE_TIMEOUT = 60 * 60 * 24 if REDIS_URL else 5
+
+# OTP codes
+# Kept in the 'otp' cache and expired by it when REDIS_URL is set. Without Redis that
+# cache is per process, so codes go to the OTPcode table and every process sees them.
+
+OTP_STORE       = os.getenv("OTP_STORE", 'accounts.otp.CacheOTPStore' if REDIS_URL
+                            else 'accounts.otp.DatabaseOTPStore')
+OTP_CACHE_ALIAS = 'otp'
+OTP_TTL         = 2 * 60
+
+# Flow tokens
+# Signed tokens carrying the state of multi-step flows (registration, OTP login, menu
+# creation) between requests, instead of database-backed sessions. Secrets such as the
+# pending password hash stay in the FLOW_CACHE_ALIAS cache, referenced by a nonce.
+
+FLOW_CACHE_ALIAS        = 'flows'
+FLOW_TOKEN_MAX_AGE      = 10 * 60
+MENU_FLOW_TOKEN_MAX_AGE = 60 * 60
+
+# API tokens
+# Tokens are signed, expire after AUTH_TOKEN_TTL seconds and are verified against the
+# AUTH_TOKEN_STORE_ALIAS cache, which must be shared by every process (Redis, or the
+# database cache without it) for revocations to reach them all at once.
+# Legacy authtoken keys are kept per process for AUTH_TOKEN_CACHE_TTL seconds and, with
+# Redis, shared between processes through the 'auth' cache.
+
+AUTH_TOKEN_TTL              = 60 * 60 * 24 * 30
+AUTH_TOKEN_STORE_ALIAS      = 'auth'
+AUTH_TOKEN_VERIFY_CACHE_TTL = 5 * 60
+
+AUTH_TOKEN_CACHE_SIZE       = 10000
+AUTH_TOKEN_CACHE_TTL        = 60
+AUTH_TOKEN_CACHE_ALIAS      = 'auth' if REDIS_URL else None
+AUTH_TOKEN_SHARED_CACHE_TTL = 10 * 60
+
+# SMS
+# OTP codes are sent by Celery workers. SMS_RATE_LIMIT (messages per second) and
+# SMS_RATE_BURST apply per worker process. With SMS_BATCH_ENABLED, providers with a bulk
+# API receive the messages queued during each SMS_BATCH_WINDOW (seconds) in one request;
+# this needs the shared (Redis) 'sms' cache, without it messages are sent one by one.
+
+SMS_BACKEND          = os.getenv("SMS_BACKEND", 'accounts.sms.ConsoleSMSBackend')
+SMS_API_URL          = os.getenv("SMS_API_URL")
+SMS_API_BULK_URL     = os.getenv("SMS_API_BULK_URL")
+SMS_API_KEY          = os.getenv("SMS_API_KEY")
+SMS_API_TIMEOUT      = 10
+SMS_SENDER           = os.getenv("SMS_SENDER")
+SMS_OTP_MESSAGE      = 'Your verification code is {code}'
+SMS_RATE_LIMIT       = float(os.getenv("SMS_RATE_LIMIT", 10))
+SMS_RATE_BURST       = int(os.getenv("SMS_RATE_BURST", 20))
+SMS_MAX_RETRIES      = 5
+SMS_RETRY_BACKOFF    = 2
+SMS_RETRY_BACKOFF_MAX = 5 * 60
+SMS_BATCH_ENABLED    = os.getenv("SMS_BATCH_ENABLED") == 'True'
+SMS_BATCH_WINDOW     = 2
+SMS_BATCH_SIZE       = 100
+SMS_OUTBOX_TIMEOUT   = 5 * 60
+SMS_CACHE_ALIAS      = 'sms'
+
+# Throttling
+# GCRA limits kept in Redis when REDIS_URL is set, so every process counts the same
+# requests; otherwise per process. Rates are REST_FRAMEWORK's DEFAULT_THROTTLE_RATES and
+# a scope in THROTTLE_BURSTS accepts that many requests at once (default: its rate's count).
+
+THROTTLE_BACKEND       = ('throttling.RedisThrottleBackend' if REDIS_URL
+                          else 'throttling.LocMemThrottleBackend')
+THROTTLE_REDIS_URL     = REDIS_URL
+THROTTLE_REDIS_TIMEOUT = 0.2
+THROTTLE_KEY_PREFIX    = 'throttle'
+THROTTLE_BURSTS        = {'scan': 500}
+
+# Expired rows purge
+# Rows are deleted PURGE_BATCH_SIZE at a time, sleeping PURGE_BATCH_PAUSE seconds in between.
+
+PURGE_BATCH_SIZE  = 1000
+PURGE_BATCH_PAUSE = 0.05
+
 # CELERY
 
 CELERY_BROKER_URL        = 'amqp://'
@@ -167,8 +355,20 @@ CELERY_ACCEPT_CONTENT    = ['json']
 CELERY_BEAT_SCHEDULE     = {
     'delete-expired-otp-codes-every-2-minutes':{
         'task':'accounts.tasks.remove_expired_otps',
-        'schedules':crontab(minute='*/2'),
-    }
+        'schedule':crontab(minute='*/2'),
+    },
+    'delete-expired-auth-tokens-every-hour':{
+        'task':'accounts.tasks.remove_expired_auth_tokens',
+        'schedule':crontab(minute=45),
+    },
+    'delete-expired-sessions-every-hour':{
+        'task':'accounts.tasks.remove_expired_sessions',
+        'schedule':crontab(minute=15),
+    },
+    'collect-orphaned-qr-images-every-night':{
+        'task':'menu.tasks.collect_orphaned_qr_images_task',
+        'schedule':crontab(hour=3, minute=30),
+    },
 }
 
 
@@ -183,16 +383,21 @@ AUTHENTICATION_BACKENDS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.ExpiringTokenAuthentication',
+        'accounts.authentication.CachedTokenAuthentication',
         
     ],
      'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'throttling.AnonRateThrottle',
+        'throttling.UserRateThrottle'
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/day',
-        'user': '1000/day'
+        'user': '1000/day',
+        'scan': '3000/min',
+        'otp': '10/hour',
+        'otp_verify': '5/min',
+        'management': '120/min',
     }
 }
 
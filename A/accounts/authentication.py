@@ -1,16 +1,52 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
 from .models import User
+from . import tokens
+
+
+def is_phone_number(identifier):
+    return identifier.isdigit() and len(identifier) <= User._meta.get_field('phone_number').max_length
+
+
+def find_user(identifier):
+    """
+    Resolves a login identifier to a user with indexed queries: phone-shaped
+    identifiers (digits only) use the unique `phone_number` index, and anything else, or
+    a phone-shaped identifier matching no phone number (numeric usernames), is a
+    case-insensitive username matched through the `UPPER(username)` index.
+
+    Usernames are not unique. When several differ only in case, the one matching
+    exactly wins; otherwise an ambiguous username resolves to no user and its owners
+    can still log in with their phone number.
+    """
+    if not identifier:
+        return None
+    if is_phone_number(identifier):
+        user = User.objects.filter(phone_number=identifier).first()
+        if user is not None:
+            return user
+
+    candidates = list(User.objects.filter(username__iexact=identifier)[:2])
+    if len(candidates) > 1:
+        candidates = list(User.objects.filter(username=identifier)[:2])
+    return candidates[0] if len(candidates) == 1 else None
 
 
 class PhoneNumberLogin:
 
     def authenticate(self, request, identifier=None, password=None):
-        try:
-            user = User.objects.get(username=identifier)
-        except User.DoesNotExist:
-            try:
-                user = User.objects.get(phone_number=identifier)
-            except User.DoesNotExist:
-                return None
+        user = find_user(identifier)
+        if user is None:
+            # Hash anyway so unknown identifiers take as long as wrong passwords.
+            User().set_password(password)
+            return None
 
         if user.check_password(password):
             return user
@@ -22,4 +58,116 @@ class PhoneNumberLogin:
             return None
         
 
-       
\ No newline at end of file
+
+class TokenCache:
+    """
+    Resolved `(user, token)` pairs keyed by a hash of the token key.
+
+    Entries live in a bounded per-process LRU for `AUTH_TOKEN_CACHE_TTL` seconds and,
+    when `AUTH_TOKEN_CACHE_ALIAS` names a shared cache, in that cache too, so a token
+    resolved by one worker is a cache hit for the others. `invalidate` clears the local
+    LRU and the shared cache; other processes may keep serving their local copy until
+    its TTL runs out, so keep that TTL short.
+    """
+
+    def __init__(self, maxsize=None, ttl=None, alias=None):
+        self.maxsize = maxsize or settings.AUTH_TOKEN_CACHE_SIZE
+        self.ttl = settings.AUTH_TOKEN_CACHE_TTL if ttl is None else ttl
+        self.alias = alias if alias is not None else settings.AUTH_TOKEN_CACHE_ALIAS
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        return caches[self.alias] if self.alias else None
+
+    def cache_key(self, key):
+        return f'token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+    def get(self, key):
+        cache_key = self.cache_key(key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(cache_key)
+                    return value
+                del self._entries[cache_key]
+
+        if self.backend is not None:
+            value = self.backend.get(cache_key)
+            if value is not None:
+                self._store(cache_key, value)
+                return value
+        return None
+
+    def set(self, key, value):
+        cache_key = self.cache_key(key)
+        self._store(cache_key, value)
+        if self.backend is not None:
+            self.backend.set(cache_key, value, timeout=settings.AUTH_TOKEN_SHARED_CACHE_TTL)
+
+    def invalidate(self, keys):
+        cache_keys = [self.cache_key(key) for key in keys]
+        with self._lock:
+            for cache_key in cache_keys:
+                self._entries.pop(cache_key, None)
+        if self.backend is not None and cache_keys:
+            self.backend.delete_many(cache_keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, cache_key, value):
+        with self._lock:
+            self._entries[cache_key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    `TokenAuthentication` that resolves tokens through `token_cache`, so repeated
+    requests with the same token skip the `Token` + `User` query. Each request gets its
+    own copy of the cached user, and tokens of deleted tokens or changed users are
+    invalidated by the signals in `accounts.signals`.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            cached = super().authenticate_credentials(key)
+            token_cache.set(key, cached)
+
+        user, token = cached
+        return copy.copy(user), token
+
+
+
+class ExpiringTokenAuthentication(TokenAuthentication):
+    """
+    Authenticates the expiring per-device tokens of `accounts.tokens`, sent as
+    `Authorization: Token <key>`. Their signature is verified locally and revocation
+    is checked in the cache, so the common path does not query the database.
+
+    Keys of the older, non-expiring `authtoken` tokens are left to the next
+    authentication class.
+    """
+
+    def authenticate_credentials(self, key):
+        if ':' not in key:
+            return None
+        try:
+            user, access = tokens.verify_token(key)
+        except tokens.InvalidToken as exc:
+            raise AuthenticationFailed(str(exc))
+
+        if not user.is_active:
+            raise AuthenticationFailed('User inactive or deleted.')
+        return user, access
@@ -0,0 +1,59 @@
+import secrets
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+
+
+FLOW_TOKEN_HEADER = 'X-Flow-Token'
+
+
+def sign_flow(flow, payload):
+    """
+    Signs the state of a multi-step flow (registration, OTP login, menu creation) into
+    a token the client sends back on the next step in the `X-Flow-Token` header, so no
+    session row is read or written between steps. The payload is only signed, not
+    encrypted: never put secrets in it, put the nonce of `stash_secret` instead.
+    """
+    return signing.dumps(payload, salt=f'accounts.flows.{flow}', compress=True)
+
+
+def read_flow(request, flow, max_age=None):
+    """
+    Returns the payload of the flow token sent with `request`, or None when it is
+    missing, tampered with, issued for another flow or older than `max_age` seconds.
+    """
+    token = request.headers.get(FLOW_TOKEN_HEADER)
+    if not token:
+        return None
+    try:
+        return signing.loads(token, salt=f'accounts.flows.{flow}',
+                             max_age=max_age or settings.FLOW_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+
+
+def _secret_key(nonce):
+    return f'secret:{nonce}'
+
+
+def stash_secret(value, timeout=None):
+    """
+    Keeps `value` server-side for the lifetime of a flow and returns a random nonce
+    to sign into the flow token in its place.
+    """
+    nonce = secrets.token_urlsafe(16)
+    caches[settings.FLOW_CACHE_ALIAS].set(_secret_key(nonce), value,
+                                          timeout=timeout or settings.FLOW_TOKEN_MAX_AGE)
+    return nonce
+
+
+def pop_secret(nonce):
+    """
+    Returns the value stashed under `nonce` and forgets it, or None when it expired
+    or was already used.
+    """
+    cache = caches[settings.FLOW_CACHE_ALIAS]
+    value = cache.get(_secret_key(nonce))
+    if value is not None:
+        cache.delete(_secret_key(nonce))
+    return value
@@ -0,0 +1,115 @@
+import random
+import statistics
+import time
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from accounts.authentication import find_user
+from accounts.models import User
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Seeds a large user table inside a transaction that is rolled back, then prints '
+            'EXPLAIN plans and latencies of login identifier resolution: the former '
+            'username-then-phone lookups versus find_user, with and without the username index.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000000)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        self.options = options
+        try:
+            with transaction.atomic():
+                self.seed()
+                after = self.run_lookups()
+                self.drop_index()
+                before = self.run_lookups()
+                self.report(before, after)
+                raise Rollback
+        except Rollback:
+            self.stdout.write('Seeded users and the dropped index have been rolled back.')
+
+    def seed(self):
+        options = self.options
+        batch_size = options['batch_size']
+        self.stdout.write(f'Seeding {options["users"]} users...')
+
+        # Hashing is the same for every lookup strategy, so all users share one hash.
+        self.password = 'benchmark'
+        password = make_password(self.password)
+        users = (User(username=f'Staff{i}', phone_number=f'09{i:09d}', password=password)
+                 for i in range(options['users']))
+        while True:
+            batch = [user for _, user in zip(range(batch_size), users)]
+            if not batch:
+                break
+            User.objects.bulk_create(batch)
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(User._meta.db_table)}')
+
+        sample = random.sample(range(options['users']), min(options['repeat'], options['users']))
+        self.phone_numbers = [f'09{i:09d}' for i in sample]
+        self.usernames = [f'staff{i}' for i in sample]
+
+    def legacy_lookup(self, identifier):
+        # What PhoneNumberLogin did before: an exact username match, then the phone number.
+        user = User.objects.filter(username=identifier).first()
+        return user or User.objects.filter(phone_number=identifier).first()
+
+    def lookups(self):
+        return {
+            'legacy, by phone number': (self.legacy_lookup, self.phone_numbers),
+            'find_user, by phone number': (find_user, self.phone_numbers),
+            'find_user, by username': (find_user, self.usernames),
+        }
+
+    def run_lookups(self):
+        results = {}
+        for name, (lookup, identifiers) in self.lookups().items():
+            timings = []
+            for identifier in identifiers:
+                started = time.perf_counter()
+                lookup(identifier)
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = {'ms': statistics.median(timings)}
+
+        timings = []
+        for identifier in self.phone_numbers[:5]:
+            started = time.perf_counter()
+            authenticate(None, identifier=identifier, password=self.password)
+            timings.append((time.perf_counter() - started) * 1000)
+        results['authenticate, including hashing'] = {'ms': statistics.median(timings)}
+
+        results['plan, by username'] = User.objects.filter(
+            username__iexact=self.usernames[0]).explain()
+        return results
+
+    def drop_index(self):
+        with connection.cursor() as cursor:
+            for index in User._meta.indexes:
+                cursor.execute(f'DROP INDEX {connection.ops.quote_name(index.name)}')
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(User._meta.db_table)}')
+
+    def report(self, before, after):
+        for name in after:
+            if name.startswith('plan'):
+                continue
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{name}'))
+            self.stdout.write(f'  without username index: {before[name]["ms"]:.3f} ms (median)')
+            self.stdout.write(f'  with username index:    {after[name]["ms"]:.3f} ms (median)')
+
+        self.stdout.write(self.style.MIGRATE_HEADING('\nplan of a username lookup'))
+        self.stdout.write('  without username index:')
+        self.stdout.write('    ' + before['plan, by username'].replace('\n', '\n    '))
+        self.stdout.write('  with username index:')
+        self.stdout.write('    ' + after['plan, by username'].replace('\n', '\n    '))
@@ -0,0 +1,57 @@
+import csv
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from accounts.provisioning import provision_users
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Creates users in bulk from a CSV file with username, phone_number and password '
+            'columns, hashing passwords on all cores, and reports the throughput.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-',
+                            help='CSV file to read, or - for standard input.')
+        parser.add_argument('--generate', type=int, default=None,
+                            help='Provision this many synthetic users instead of reading a file.')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Hashing processes, one per core by default.')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--hasher', default='default',
+                            help='Password hasher algorithm, e.g. argon2 or scrypt.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Roll the created users back, e.g. to measure throughput.')
+
+    def handle(self, *args, **options):
+        if options['generate']:
+            rows = ({'username': f'staff{i}', 'phone_number': f'08{i:09d}',
+                     'password': f'password-{i}'} for i in range(options['generate']))
+            self.run(rows, options)
+        elif options['path'] == '-':
+            self.run(csv.DictReader(sys.stdin), options)
+        else:
+            try:
+                with open(options['path'], newline='', encoding='utf-8') as csv_file:
+                    self.run(csv.DictReader(csv_file), options)
+            except FileNotFoundError:
+                raise CommandError(f'{options["path"]} does not exist')
+
+    def run(self, rows, options):
+        try:
+            with transaction.atomic():
+                stats = provision_users(rows, workers=options['workers'],
+                                        batch_size=options['batch_size'],
+                                        hasher=options['hasher'])
+                if options['dry_run']:
+                    raise Rollback
+        except Rollback:
+            self.stdout.write('Dry run: the created users have been rolled back.')
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        for name, value in stats.items():
+            self.stdout.write(f'{name}: {value}')
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_otpcode_created_at_user_created_at_user_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='otpcode',
+            index=models.Index(fields=['phone_number', '-created_at'], name='otpcode_phone_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='otpcode',
+            index=models.Index(fields=['created_at'], name='otpcode_created_at_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from .manager import UserManger
 
@@ -23,6 +24,12 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     objects = UserManger()
 
+    class Meta:
+        indexes = [
+            # Case-insensitive username lookups of PhoneNumberLogin.
+            models.Index(Upper('username'), name='user_username_upper_idx'),
+        ]
+
     def __str__(self):
         return f"{self.username}-{self.phone_number}-{self.id}"
 
@@ -43,7 +50,37 @@ class OTPcode(models.Model):
     phone_number = models.CharField(max_length=11)
     code = models.IntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Latest code for a phone number during verification.
+            models.Index(fields=['phone_number', '-created_at'], name='otpcode_phone_created_idx'),
+            # Range scans of the expired-code purge.
+            models.Index(fields=['created_at'], name='otpcode_created_at_idx'),
+        ]
     
     def  __str__(self):
         return f"{self.phone_number}-{self.code}"
     
+
+
+class AuthToken(models.Model):
+    """
+    API token of one device of a user. Only a SHA-256 hash of the token is stored; the
+    token itself is a signed payload that can be verified without reading this table
+    (see `accounts.tokens`).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='auth_tokens')
+    device = models.CharField(max_length=64)
+    key_hash = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            # One token per device; also serves revoking all tokens of a user.
+            models.UniqueConstraint(fields=['user', 'device'], name='authtoken_user_device_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}-{self.device}"
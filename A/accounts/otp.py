@@ -0,0 +1,83 @@
+import secrets
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import OTPcode
+
+
+def generate_code():
+    return 1000 + secrets.randbelow(9000)
+
+
+class CacheOTPStore:
+    """
+    Keeps OTP codes in the `OTP_CACHE_ALIAS` cache (Redis in production) and lets the
+    cache expire them after `OTP_TTL` seconds, so login storms never write to the
+    primary database and no sweeping is needed.
+
+    Each code lives under a key made of the phone number and the code itself, so
+    verifying is a single `delete` whose return value tells whether the code existed:
+    it is atomic, and a code can only ever be used once even by concurrent requests.
+    A second key remembers the latest code per phone number so issuing a new code
+    revokes the previous one.
+    """
+
+    def __init__(self, alias=None):
+        self.alias = alias or settings.OTP_CACHE_ALIAS
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def latest_key(self, phone_number):
+        return f'otp:{phone_number}'
+
+    def code_key(self, phone_number, code):
+        return f'otp:{phone_number}:{code}'
+
+    def issue(self, phone_number):
+        code = generate_code()
+        self.set(phone_number, code)
+        return code
+
+    def set(self, phone_number, code):
+        previous = self.backend.get(self.latest_key(phone_number))
+        self.backend.set_many({self.latest_key(phone_number): code,
+                               self.code_key(phone_number, code): 1},
+                              timeout=settings.OTP_TTL)
+        if previous is not None and previous != code:
+            self.backend.delete(self.code_key(phone_number, previous))
+
+    def verify(self, phone_number, code):
+        """
+        Consumes the code and returns True when it is the valid code of the phone number.
+        """
+        return bool(self.backend.delete(self.code_key(phone_number, code)))
+
+
+class DatabaseOTPStore:
+    """
+    Keeps OTP codes in the `OTPcode` table, for deployments without a shared cache.
+    Codes older than `OTP_TTL` seconds are ignored and removed by the purge task.
+    """
+
+    def issue(self, phone_number):
+        code = generate_code()
+        self.set(phone_number, code)
+        return code
+
+    def set(self, phone_number, code):
+        OTPcode.objects.filter(phone_number=phone_number).delete()
+        OTPcode.objects.create(phone_number=phone_number, code=code)
+
+    def verify(self, phone_number, code):
+        cutoff = timezone.now() - timedelta(seconds=settings.OTP_TTL)
+        deleted, _ = OTPcode.objects.filter(phone_number=phone_number, code=code,
+                                            created_at__gte=cutoff).delete()
+        return deleted > 0
+
+
+def get_otp_store():
+    return import_string(settings.OTP_STORE)()
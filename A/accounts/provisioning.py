@@ -0,0 +1,91 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import django
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+from .models import User
+
+
+def _init_worker():
+    # Spawned (not forked) workers start with an unconfigured Django.
+    if not apps.ready:
+        django.setup()
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for element in iterable:
+        chunk.append(element)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def provision_users(rows, workers=None, batch_size=None, hasher='default'):
+    """
+    Creates users from an iterable of dicts with `username`, `phone_number` and
+    `password`, e.g. the staff of a restaurant chain.
+
+    Rows are handled `batch_size` at a time: phone numbers that already exist (or repeat
+    within the input) are skipped with one query, the passwords of the rest are hashed
+    in a pool of `workers` processes so the hasher's CPU cost is spread across cores,
+    and the users are inserted with a single `bulk_create`. `hasher` names the
+    algorithm to use, `'default'` being the first of `PASSWORD_HASHERS`.
+
+    Returns counters including the throughput in users per second.
+    """
+    workers = workers or os.cpu_count() or 1
+    batch_size = batch_size or settings.PROVISIONING_BATCH_SIZE
+    get_hasher(hasher)  # Fail fast on an unknown algorithm.
+    hash_password = partial(make_password, hasher=hasher)
+
+    stats = {'created': 0, 'skipped': 0, 'hash_seconds': 0.0, 'insert_seconds': 0.0}
+    seen = set()
+    started = time.monotonic()
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) if workers > 1 else None
+    try:
+        for batch in _chunks(rows, batch_size):
+            phone_numbers = [row['phone_number'] for row in batch]
+            existing = set(User.objects.filter(phone_number__in=phone_numbers)
+                           .values_list('phone_number', flat=True))
+            new_rows = []
+            for row in batch:
+                if row['phone_number'] in existing or row['phone_number'] in seen:
+                    stats['skipped'] += 1
+                    continue
+                seen.add(row['phone_number'])
+                new_rows.append(row)
+            if not new_rows:
+                continue
+
+            hashing_started = time.monotonic()
+            passwords = [row['password'] for row in new_rows]
+            if pool is None:
+                hashed = [hash_password(password) for password in passwords]
+            else:
+                chunksize = max(1, len(passwords) // (workers * 4))
+                hashed = list(pool.map(hash_password, passwords, chunksize=chunksize))
+            stats['hash_seconds'] += time.monotonic() - hashing_started
+
+            inserting_started = time.monotonic()
+            User.objects.bulk_create(
+                [User(username=row['username'], phone_number=row['phone_number'], password=password)
+                 for row, password in zip(new_rows, hashed)])
+            stats['insert_seconds'] += time.monotonic() - inserting_started
+            stats['created'] += len(new_rows)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    elapsed = time.monotonic() - started
+    stats['elapsed'] = round(elapsed, 3)
+    stats['hash_seconds'] = round(stats['hash_seconds'], 3)
+    stats['insert_seconds'] = round(stats['insert_seconds'], 3)
+    stats['users_per_second'] = round(stats['created'] / elapsed, 1) if elapsed else 0.0
+    return stats
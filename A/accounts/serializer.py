@@ -23,16 +23,18 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 class OTPserializer(serializers.ModelSerializer):
+        device = serializers.CharField(max_length=64, required=False, default='default')
         class Meta:
              model = OTPcode
              fields = [
-                  'code'
+                  'code', 'device'
              ]
 
 class UserloginPasswordSerializer(serializers.Serializer):
      
      identifier = serializers.CharField(required=True)
      password = serializers.CharField(required=True)  
+     device = serializers.CharField(max_length=64, required=False, default='default')
 
 
 class UserLoginSendCodeSerializer(serializers.Serializer):
@@ -40,4 +42,5 @@ class UserLoginSendCodeSerializer(serializers.Serializer):
      phone_number = serializers.CharField(required=True)
 
 class UserLoginReceiveCodeSerializer(serializers.Serializer):
-     code = serializers.IntegerField(required=True)
\ No newline at end of file
+     code = serializers.IntegerField(required=True)
+     device = serializers.CharField(max_length=64, required=False, default='default')
\ No newline at end of file
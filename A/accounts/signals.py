@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import token_cache
+from .tokens import forget_user
+from .models import User
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    token_cache.invalidate([instance.key])
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """
+    Cached tokens carry a copy of their user, so any change to the user, deactivation
+    included, drops them and the user from the caches.
+    """
+    if not created:
+        token_cache.invalidate(Token.objects.filter(user=instance).values_list('key', flat=True))
+        forget_user(instance.pk)
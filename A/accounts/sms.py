@@ -0,0 +1,292 @@
+import json
+import logging
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+# Messages sent through `LocMemSMSBackend`, for tests.
+outbox = []
+
+
+class SMSDeliveryError(Exception):
+    pass
+
+
+class RateLimited(Exception):
+
+    def __init__(self, wait):
+        super().__init__(f'SMS provider rate limit reached, retry in {wait:.2f}s')
+        self.wait = wait
+
+
+class ConsoleSMSBackend:
+    """
+    Logs messages instead of sending them, for local development.
+    """
+
+    supports_bulk = True
+
+    def send(self, phone_number, message):
+        logger.info('SMS to %s: %s', phone_number, message)
+
+    def send_bulk(self, messages):
+        for phone_number, message in messages:
+            self.send(phone_number, message)
+
+
+class LocMemSMSBackend:
+    """
+    Appends messages to the module level `outbox` list, for tests.
+    """
+
+    supports_bulk = True
+
+    def send(self, phone_number, message):
+        outbox.append((phone_number, message))
+
+    def send_bulk(self, messages):
+        outbox.extend((phone_number, message) for phone_number, message in messages)
+
+
+class HTTPSMSBackend:
+    """
+    Posts messages as JSON to the provider's `SMS_API_URL`. When `SMS_API_BULK_URL` is
+    set, batches are sent to it in a single request as a list of messages.
+    """
+
+    def __init__(self):
+        self.url = settings.SMS_API_URL
+        self.bulk_url = settings.SMS_API_BULK_URL
+        self.supports_bulk = bool(self.bulk_url)
+
+    def send(self, phone_number, message):
+        self.post(self.url, self.payload(phone_number, message))
+
+    def send_bulk(self, messages):
+        self.post(self.bulk_url, [self.payload(phone_number, message)
+                                  for phone_number, message in messages])
+
+    def payload(self, phone_number, message):
+        return {'sender': settings.SMS_SENDER, 'receptor': phone_number, 'message': message}
+
+    def post(self, url, payload):
+        request = urllib.request.Request(
+            url, data=json.dumps(payload).encode('utf-8'), method='POST',
+            headers={'Content-Type': 'application/json',
+                     'Authorization': f'Bearer {settings.SMS_API_KEY}'})
+        try:
+            with urllib.request.urlopen(request, timeout=settings.SMS_API_TIMEOUT) as response:
+                response.read()
+        except (urllib.error.URLError, TimeoutError) as exc:
+            raise SMSDeliveryError(str(exc)) from exc
+
+
+def get_sms_backend():
+    return import_string(settings.SMS_BACKEND)()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at `rate` tokens per second up to `capacity`.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """
+        Takes `tokens` from the bucket and returns 0, or returns the number of seconds
+        to wait until they are available without taking anything.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0
+            return (tokens - self.tokens) / self.rate
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_rate_limiter(backend_path=None):
+    """
+    Token bucket of the given provider in this process. Each worker process enforces
+    `SMS_RATE_LIMIT` on its own, so set it to the provider limit divided by the number
+    of worker processes.
+    """
+    backend_path = backend_path or settings.SMS_BACKEND
+    with _buckets_lock:
+        if backend_path not in _buckets:
+            _buckets[backend_path] = TokenBucket(settings.SMS_RATE_LIMIT, settings.SMS_RATE_BURST)
+        return _buckets[backend_path]
+
+
+def deliver(messages, backend=None, rate_limiter=None):
+    """
+    Sends `(phone_number, message)` pairs in one provider request: a bulk request for
+    several messages, a plain one otherwise. Raises `RateLimited` when the provider's
+    token bucket is empty and `SMSDeliveryError` when the provider fails.
+    """
+    backend = backend or get_sms_backend()
+    rate_limiter = rate_limiter or get_rate_limiter()
+
+    wait = rate_limiter.acquire()
+    if wait:
+        raise RateLimited(wait)
+
+    if len(messages) > 1:
+        backend.send_bulk(messages)
+    else:
+        backend.send(*messages[0])
+
+
+def retry_backoff(retries):
+    """
+    Exponential backoff with jitter for the `retries`-th retry of a failed delivery.
+    """
+    base = settings.SMS_RETRY_BACKOFF
+    return min(base * 2 ** retries, settings.SMS_RETRY_BACKOFF_MAX) + random.uniform(0, base)
+
+
+def otp_message(code):
+    return settings.SMS_OTP_MESSAGE.format(code=code)
+
+
+class SMSOutbox:
+    """
+    Shared queue of messages waiting to be sent in bulk, kept in the `SMS_CACHE_ALIAS`
+    cache so web and worker processes see the same one.
+
+    Messages get increasing sequence numbers from an atomic `incr`. The first message of
+    a window schedules a flush `SMS_BATCH_WINDOW` seconds later, which sends everything
+    queued meanwhile in batches of `SMS_BATCH_SIZE`.
+    """
+
+    head_key = 'outbox:head'
+    tail_key = 'outbox:tail'
+    scheduled_key = 'outbox:scheduled'
+    flushing_key = 'outbox:flushing'
+    gap_key = 'outbox:gap'
+
+    def __init__(self, alias=None):
+        self.alias = alias or settings.SMS_CACHE_ALIAS
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    @property
+    def is_shared(self):
+        # A per-process cache would strand messages pushed by web processes, since the
+        # worker flushes its own, empty outbox.
+        return not isinstance(self.backend, (LocMemCache, DummyCache))
+
+    def message_key(self, sequence):
+        return f'outbox:message:{sequence}'
+
+    def push(self, phone_number, message):
+        """
+        Queues a message and returns True when the caller should schedule a flush.
+        """
+        self.backend.add(self.head_key, 0, timeout=None)
+        sequence = self.backend.incr(self.head_key)
+        self.backend.set(self.message_key(sequence), [phone_number, message],
+                         timeout=settings.SMS_OUTBOX_TIMEOUT)
+        return self.backend.add(self.scheduled_key, 1, timeout=settings.SMS_BATCH_WINDOW)
+
+    def flush(self, send):
+        """
+        Calls `send(batch)` for the queued messages and returns how many were handed
+        over. Stops at a sequence number whose message is not stored yet, so a flush
+        racing a `push` leaves it for the next flush; a message still missing on that
+        next flush was lost (expired or never stored) and is skipped.
+        """
+        if not self.backend.add(self.flushing_key, 1, timeout=settings.SMS_OUTBOX_TIMEOUT):
+            return 0
+        try:
+            tail = self.backend.get(self.tail_key, 0)
+            head = self.backend.get(self.head_key, 0)
+            flushed = 0
+            while tail < head:
+                keys = [self.message_key(sequence)
+                        for sequence in range(tail + 1, min(head, tail + settings.SMS_BATCH_SIZE) + 1)]
+                stored = self.backend.get_many(keys)
+                batch = []
+                for key in keys:
+                    if key not in stored:
+                        break
+                    batch.append(stored[key])
+
+                if not batch:
+                    if self.backend.get(self.gap_key) != tail + 1:
+                        self.backend.set(self.gap_key, tail + 1, timeout=settings.SMS_OUTBOX_TIMEOUT)
+                        break
+                    tail += 1
+                    self.backend.set(self.tail_key, tail, timeout=None)
+                    continue
+
+                send(batch)
+                tail += len(batch)
+                flushed += len(batch)
+                self.backend.set(self.tail_key, tail, timeout=None)
+                self.backend.delete_many(keys[:len(batch)])
+            return flushed
+        finally:
+            self.backend.delete(self.flushing_key)
+
+    def pending(self):
+        return self.backend.get(self.head_key, 0) - self.backend.get(self.tail_key, 0)
+
+
+sms_outbox = SMSOutbox()
+
+
+def use_outbox():
+    if not settings.SMS_BATCH_ENABLED or not getattr(get_sms_backend(), 'supports_bulk', False):
+        return False
+    if not sms_outbox.is_shared:
+        logger.warning('SMS_BATCH_ENABLED needs a shared %r cache, sending messages one by one',
+                       sms_outbox.alias)
+        return False
+    return True
+
+
+def send_otp_code(phone_number, code):
+    """
+    Queues the OTP message once the current transaction commits, so the request never
+    waits on the SMS provider. With `SMS_BATCH_ENABLED` and a provider that has a bulk
+    API, the message goes through `sms_outbox` and is sent with the others of its window,
+    provided the outbox lives in a cache shared with the workers; otherwise it is sent
+    on its own.
+    """
+    from . import tasks
+
+    messages = [[phone_number, otp_message(code)]]
+
+    def enqueue():
+        if use_outbox():
+            if sms_outbox.push(*messages[0]):
+                tasks.flush_sms_outbox_task.apply_async(countdown=settings.SMS_BATCH_WINDOW)
+        else:
+            tasks.send_sms_task.delay(messages)
+
+    transaction.on_commit(enqueue)
@@ -1,10 +1,55 @@
-from .models import OTPcode
+from .models import OTPcode, AuthToken
+from . import sms
 from celery import shared_task
-from django.utils import timezone
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from purge import purge_expired
 
 
 @shared_task
 def remove_expired_otps():
-    now = timezone.now()
-    expired_opts = OTPcode.objects.filter(created_at__lt=now)
-    expired_opts.delete()
\ No newline at end of file
+    """
+    Purges OTP codes older than `OTP_TTL` from the `OTPcode` table used by
+    `DatabaseOTPStore`, in bounded batches.
+    """
+    return purge_expired(OTPcode, 'created_at', ttl=settings.OTP_TTL)
+
+
+@shared_task
+def remove_expired_auth_tokens():
+    return purge_expired(AuthToken, 'expires_at')
+
+
+@shared_task
+def remove_expired_sessions():
+    """
+    Batched replacement for `clearsessions`, which deletes every expired session in one
+    statement.
+    """
+    return purge_expired(Session, 'expire_date')
+
+
+@shared_task(bind=True, max_retries=settings.SMS_MAX_RETRIES)
+def send_sms_task(self, messages):
+    """
+    Sends `[phone_number, message]` pairs in one provider request. Waits for the
+    provider's token bucket when it is empty, and retries failed deliveries with
+    exponential backoff.
+    """
+    try:
+        sms.deliver(messages)
+    except sms.RateLimited as exc:
+        raise self.retry(exc=exc, countdown=exc.wait, max_retries=None)
+    except sms.SMSDeliveryError as exc:
+        raise self.retry(exc=exc, countdown=sms.retry_backoff(self.request.retries))
+
+
+@shared_task
+def flush_sms_outbox_task():
+    """
+    Hands the messages queued in `sms_outbox` to `send_sms_task` in bulk batches.
+    """
+    flushed = sms.sms_outbox.flush(send_sms_task.delay)
+    if sms.sms_outbox.pending():
+        flush_sms_outbox_task.apply_async(countdown=settings.SMS_BATCH_WINDOW)
+    return flushed
@@ -0,0 +1,113 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+from django.contrib.auth import authenticate
+from accounts.authentication import TokenCache, find_user, token_cache
+from accounts.models import User
+
+
+class TestCachedTokenAuthentication(APITestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='spongebob',
+                                             phone_number='0123456789',
+                                             password='1234')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = reverse('home:menu-list')
+
+    def test_token_lookup_is_cached(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(1):
+            # Only the menu list query itself.
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_logout_invalidates_cached_token(self):
+        self.client.get(self.url)
+        response = self.client.post(reverse('accounts:logout'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivation_invalidates_cached_token(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalid_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TestTokenCache(APITestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = TokenCache(maxsize=2, ttl=60, alias='')
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (1, None, 3))
+
+    def test_entries_expire(self):
+        cache = TokenCache(maxsize=2, ttl=0, alias='')
+        cache.set('a', 1)
+        self.assertIsNone(cache.get('a'))
+
+    def test_shared_backend(self):
+        writer, reader = TokenCache(ttl=60, alias='auth'), TokenCache(ttl=60, alias='auth')
+        writer.set('a', 1)
+        self.assertEqual(reader.get('a'), 1)
+        writer.invalidate(['a'])
+        reader.clear()
+        self.assertIsNone(reader.get('a'))
+
+
+class TestFindUser(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='SpongeBob',
+                                             phone_number='0123456789',
+                                             password='1234')
+
+    def test_phone_number_single_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(find_user('0123456789'), self.user)
+
+    def test_username_is_case_insensitive(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(find_user('spongebob'), self.user)
+
+    def test_ambiguous_username(self):
+        User.objects.create_user(username='spongebob', phone_number='0987654321', password='1234')
+        self.assertIsNone(find_user('SPONGEBOB'))
+        self.assertEqual(find_user('0123456789'), self.user)
+
+    def test_exact_username_wins_over_case_variants(self):
+        other = User.objects.create_user(username='spongebob', phone_number='0987654321',
+                                         password='1234')
+        self.assertEqual(find_user('SpongeBob'), self.user)
+        self.assertEqual(find_user('spongebob'), other)
+
+    def test_numeric_username(self):
+        user = User.objects.create_user(username='12345', phone_number='0987654321',
+                                        password='1234')
+        with self.assertNumQueries(2):
+            self.assertEqual(find_user('12345'), user)
+        self.assertEqual(authenticate(None, identifier='12345', password='1234'), user)
+
+    def test_unknown_identifier(self):
+        self.assertIsNone(find_user('patrick'))
+        self.assertIsNone(find_user(''))
+
+    def test_authenticate(self):
+        self.assertEqual(authenticate(None, identifier='spongebob', password='1234'), self.user)
+        self.assertIsNone(authenticate(None, identifier='spongebob', password='wrong'))
+        self.assertIsNone(authenticate(None, identifier='patrick', password='1234'))
@@ -0,0 +1,57 @@
+from datetime import timedelta
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from accounts.models import OTPcode
+from accounts.otp import CacheOTPStore, DatabaseOTPStore
+
+
+class TestCacheOTPStore(TestCase):
+
+    def setUp(self):
+        caches['otp'].clear()
+        self.store = CacheOTPStore()
+
+    def test_code_is_single_use(self):
+        code = self.store.issue('0123456789')
+        self.assertTrue(1000 <= code <= 9999)
+        self.assertFalse(self.store.verify('0123456789', code + 1 if code < 9999 else 1000))
+        self.assertTrue(self.store.verify('0123456789', code))
+        self.assertFalse(self.store.verify('0123456789', code))
+
+    def test_new_code_revokes_previous(self):
+        self.store.set('0123456789', 1111)
+        self.store.set('0123456789', 2222)
+        self.assertFalse(self.store.verify('0123456789', 1111))
+        self.assertTrue(self.store.verify('0123456789', 2222))
+
+    def test_codes_are_per_phone_number(self):
+        self.store.set('0123456789', 1111)
+        self.assertFalse(self.store.verify('0987654321', 1111))
+
+    def test_writes_nothing_to_the_database(self):
+        with self.assertNumQueries(0):
+            self.store.verify('0123456789', self.store.issue('0123456789'))
+
+
+class TestDatabaseOTPStore(TestCase):
+
+    def setUp(self):
+        self.store = DatabaseOTPStore()
+
+    def test_code_is_single_use(self):
+        self.store.set('0123456789', 1111)
+        self.assertTrue(self.store.verify('0123456789', 1111))
+        self.assertFalse(self.store.verify('0123456789', 1111))
+
+    def test_new_code_revokes_previous(self):
+        self.store.set('0123456789', 1111)
+        self.store.set('0123456789', 2222)
+        self.assertEqual(OTPcode.objects.count(), 1)
+        self.assertFalse(self.store.verify('0123456789', 1111))
+
+    @override_settings(OTP_TTL=60)
+    def test_expired_code_is_rejected(self):
+        self.store.set('0123456789', 1111)
+        OTPcode.objects.update(created_at=timezone.now() - timedelta(seconds=61))
+        self.assertFalse(self.store.verify('0123456789', 1111))
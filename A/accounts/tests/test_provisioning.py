@@ -0,0 +1,49 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from accounts.models import User
+from accounts.provisioning import provision_users
+
+
+class TestProvisionUsers(TestCase):
+
+    def rows(self, count, start=0):
+        return [{'username': f'staff{i}', 'phone_number': f'08{i:09d}', 'password': f'secret{i}'}
+                for i in range(start, start + count)]
+
+    def test_bulk_creates_users_with_hashed_passwords(self):
+        stats = provision_users(self.rows(25), workers=1, batch_size=10)
+
+        self.assertEqual(stats['created'], 25)
+        self.assertGreater(stats['users_per_second'], 0)
+        user = User.objects.get(phone_number='08000000007')
+        self.assertTrue(user.check_password('secret7'))
+
+    def test_hashes_in_a_process_pool(self):
+        stats = provision_users(self.rows(8), workers=2, batch_size=4)
+        self.assertEqual(stats['created'], 8)
+        self.assertTrue(User.objects.get(phone_number='08000000003').check_password('secret3'))
+
+    def test_skips_existing_and_repeated_phone_numbers(self):
+        provision_users(self.rows(5), workers=1)
+        stats = provision_users(self.rows(5, start=3) + self.rows(1, start=9) + self.rows(1, start=9),
+                                workers=1)
+
+        self.assertEqual((stats['created'], stats['skipped']), (4, 3))
+        self.assertEqual(User.objects.count(), 9)
+
+    def test_batch_queries(self):
+        # One existence check and one INSERT per batch.
+        with self.assertNumQueries(4):
+            provision_users(self.rows(20), workers=1, batch_size=10)
+
+    def test_unknown_hasher(self):
+        with self.assertRaises(ValueError):
+            provision_users(self.rows(1), workers=1, hasher='rot13')
+
+    def test_command_dry_run(self):
+        out = StringIO()
+        call_command('provision_users', generate=5, workers=1, dry_run=True, stdout=out)
+        self.assertIn('created: 5', out.getvalue())
+        self.assertIn('users_per_second', out.getvalue())
+        self.assertEqual(User.objects.count(), 0)
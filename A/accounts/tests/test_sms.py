@@ -0,0 +1,101 @@
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from unittest.mock import PropertyMock, patch
+from celery.exceptions import Retry
+from accounts import sms, tasks
+
+
+@override_settings(SMS_BACKEND='accounts.sms.LocMemSMSBackend')
+class TestDeliver(TestCase):
+
+    def setUp(self):
+        sms.outbox.clear()
+
+    def test_deliver_single_message(self):
+        sms.deliver([['0123456789', 'hello']], rate_limiter=sms.TokenBucket(1, 1))
+        self.assertEqual(sms.outbox, [('0123456789', 'hello')])
+
+    def test_deliver_bulk(self):
+        sms.deliver([['0123456789', 'a'], ['0987654321', 'b']], rate_limiter=sms.TokenBucket(1, 1))
+        self.assertEqual(len(sms.outbox), 2)
+
+    def test_deliver_rate_limited(self):
+        bucket = sms.TokenBucket(rate=1, capacity=1)
+        sms.deliver([['0123456789', 'a']], rate_limiter=bucket)
+        with self.assertRaises(sms.RateLimited) as raised:
+            sms.deliver([['0123456789', 'b']], rate_limiter=bucket)
+        self.assertGreater(raised.exception.wait, 0)
+        self.assertEqual(len(sms.outbox), 1)
+
+    def test_send_otp_code_queues_task_on_commit(self):
+        with patch('accounts.tasks.send_sms_task.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                sms.send_otp_code('0123456789', 1234)
+        delay.assert_called_once_with([['0123456789', 'Your verification code is 1234']])
+
+
+class TestSendSMSTask(TestCase):
+
+    def test_retries_with_backoff_on_delivery_error(self):
+        with patch('accounts.sms.deliver', side_effect=sms.SMSDeliveryError('down')), \
+             patch('accounts.sms.retry_backoff', return_value=4), \
+             patch('accounts.tasks.send_sms_task.retry', side_effect=Retry) as retry:
+            with self.assertRaises(Retry):
+                tasks.send_sms_task([['0123456789', 'hello']])
+        self.assertEqual(retry.call_args.kwargs['countdown'], 4)
+
+    def test_waits_for_rate_limit(self):
+        with patch('accounts.sms.deliver', side_effect=sms.RateLimited(0.5)), \
+             patch('accounts.tasks.send_sms_task.retry', side_effect=Retry) as retry:
+            with self.assertRaises(Retry):
+                tasks.send_sms_task([['0123456789', 'hello']])
+        self.assertEqual(retry.call_args.kwargs['countdown'], 0.5)
+        self.assertIsNone(retry.call_args.kwargs['max_retries'])
+
+
+@override_settings(SMS_BATCH_SIZE=2)
+class TestSMSOutbox(TestCase):
+
+    def setUp(self):
+        caches['sms'].clear()
+        self.outbox = sms.SMSOutbox()
+
+    def test_flush_sends_in_batches(self):
+        scheduled = [self.outbox.push(f'0{i}', 'code') for i in range(5)]
+        self.assertEqual(scheduled, [True, False, False, False, False])
+
+        batches = []
+        self.assertEqual(self.outbox.flush(batches.append), 5)
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+        self.assertEqual(self.outbox.pending(), 0)
+        self.assertEqual(self.outbox.flush(batches.append), 0)
+
+    def test_flush_skips_lost_message_on_second_pass(self):
+        self.outbox.push('01', 'code')
+        self.outbox.backend.incr(self.outbox.head_key)  # a push that never stored its message
+        self.outbox.push('03', 'code')
+
+        batches = []
+        self.assertEqual(self.outbox.flush(batches.append), 1)
+        self.assertEqual(self.outbox.pending(), 2)
+        self.assertEqual(self.outbox.flush(batches.append), 1)
+        self.assertEqual(batches, [[['01', 'code']], [['03', 'code']]])
+
+    @override_settings(SMS_BATCH_ENABLED=True, SMS_BACKEND='accounts.sms.LocMemSMSBackend')
+    def test_send_otp_code_uses_outbox(self):
+        with patch('accounts.sms.SMSOutbox.is_shared', new_callable=PropertyMock, return_value=True):
+            with patch('accounts.tasks.flush_sms_outbox_task.apply_async') as apply_async:
+                with self.captureOnCommitCallbacks(execute=True):
+                    sms.send_otp_code('0123456789', 1234)
+                    sms.send_otp_code('0987654321', 4321)
+        apply_async.assert_called_once()
+        self.assertEqual(self.outbox.pending(), 2)
+
+    @override_settings(SMS_BATCH_ENABLED=True, SMS_BACKEND='accounts.sms.LocMemSMSBackend')
+    def test_send_otp_code_without_shared_cache(self):
+        self.assertFalse(self.outbox.is_shared)
+        with patch('accounts.tasks.send_sms_task.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                sms.send_otp_code('0123456789', 1234)
+        delay.assert_called_once_with([['0123456789', sms.otp_message(1234)]])
+        self.assertEqual(self.outbox.pending(), 0)
@@ -0,0 +1,55 @@
+from datetime import timedelta
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from accounts.models import OTPcode
+from accounts import tasks
+from purge import purge_expired
+
+
+class TestPurgeExpired(TestCase):
+
+    def setUp(self):
+        OTPcode.objects.bulk_create([OTPcode(phone_number=f'0{i:09d}', code=1234)
+                                     for i in range(25)])
+        # auto_now_add overrides created_at on insert.
+        old = OTPcode.objects.order_by('id')[:20].values_list('id', flat=True)
+        OTPcode.objects.filter(id__in=list(old)).update(
+            created_at=timezone.now() - timedelta(minutes=10))
+
+    def test_purges_in_batches(self):
+        stats = purge_expired(OTPcode, 'created_at', ttl=60, batch_size=8, pause=0)
+
+        self.assertEqual(stats['purged'], 20)
+        self.assertEqual(stats['batches'], 3)
+        self.assertEqual(stats['table'], OTPcode._meta.db_table)
+        self.assertEqual(OTPcode.objects.count(), 5)
+
+    def test_max_batches(self):
+        stats = purge_expired(OTPcode, 'created_at', ttl=60, batch_size=8, pause=0, max_batches=1)
+        self.assertEqual(stats['purged'], 8)
+        self.assertEqual(OTPcode.objects.count(), 17)
+
+    def test_batch_queries(self):
+        # One SELECT of primary keys and one DELETE per batch (8, 8 and 4 rows), each in a
+        # savepoint here; the short last batch ends the run without another SELECT.
+        with self.assertNumQueries(4 * 3):
+            purge_expired(OTPcode, 'created_at', ttl=60, batch_size=8, pause=0)
+
+    @override_settings(OTP_TTL=60)
+    def test_remove_expired_otps_uses_ttl(self):
+        self.assertEqual(tasks.remove_expired_otps()['purged'], 20)
+        self.assertEqual(OTPcode.objects.count(), 5)
+
+    def test_remove_expired_sessions(self):
+        expired, active = SessionStore(), SessionStore()
+        expired.set_expiry(1)
+        expired.save()
+        active.save()
+        Session.objects.filter(session_key=expired.session_key).update(
+            expire_date=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(tasks.remove_expired_sessions()['purged'], 1)
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)),
+                         [active.session_key])
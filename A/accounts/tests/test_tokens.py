@@ -0,0 +1,127 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from accounts import tokens
+from accounts.models import AuthToken, User
+
+
+# The token store in Redis, which is not counted among database queries like the
+# database cache used without it.
+IN_MEMORY_STORE = override_settings(CACHES={
+    **settings.CACHES,
+    'auth': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'auth'},
+})
+
+class TestTokens(TestCase):
+
+    def setUp(self):
+        caches['auth'].clear()
+        self.user = User.objects.create_user(username='spongebob',
+                                             phone_number='0123456789',
+                                             password='1234')
+
+    def test_only_hash_is_stored(self):
+        key, _ = tokens.issue_token(self.user, 'phone')
+        stored = AuthToken.objects.get(user=self.user)
+        self.assertEqual(stored.key_hash, tokens.hash_token(key))
+        self.assertNotIn(key, stored.key_hash)
+
+    @IN_MEMORY_STORE
+    def test_verify_without_database_once_cached(self):
+        key, _ = tokens.issue_token(self.user, 'phone')
+        tokens.verify_token(key)
+        with self.assertNumQueries(0):
+            user, access = tokens.verify_token(key)
+        self.assertEqual((user.pk, access.device), (self.user.pk, 'phone'))
+
+    def test_new_token_replaces_device_token(self):
+        old_key, _ = tokens.issue_token(self.user, 'phone')
+        tokens.verify_token(old_key)
+        tokens.issue_token(self.user, 'phone')
+        tokens.issue_token(self.user, 'tablet')
+
+        self.assertEqual(AuthToken.objects.filter(user=self.user).count(), 2)
+        with self.assertRaises(tokens.InvalidToken):
+            tokens.verify_token(old_key)
+
+    def test_revoke_all_tokens(self):
+        keys = [tokens.issue_token(self.user, device)[0] for device in ('phone', 'tablet')]
+        for key in keys:
+            tokens.verify_token(key)
+
+        self.assertEqual(tokens.revoke_all_tokens(self.user), 2)
+        for key in keys:
+            with self.assertRaises(tokens.InvalidToken):
+                tokens.verify_token(key)
+
+        key, _ = tokens.issue_token(self.user, 'phone')
+        self.assertEqual(tokens.verify_token(key)[0].pk, self.user.pk)
+
+    @IN_MEMORY_STORE
+    def test_revoke_all_tokens_is_one_statement(self):
+        for device in ('phone', 'tablet', 'laptop'):
+            tokens.issue_token(self.user, device)
+        with self.assertNumQueries(1):
+            tokens.revoke_all_tokens(self.user)
+
+    def test_tampered_token(self):
+        key, _ = tokens.issue_token(self.user, 'phone')
+        with self.assertRaises(tokens.InvalidToken):
+            tokens.verify_token(key[:-2] + ('AA' if not key.endswith('AA') else 'BB'))
+
+    @override_settings(AUTH_TOKEN_TTL=60)
+    def test_expired_token_in_database(self):
+        key, _ = tokens.issue_token(self.user, 'phone')
+        AuthToken.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        with self.assertRaises(tokens.InvalidToken):
+            tokens.verify_token(key)
+
+
+class TestExpiringTokenAuthentication(APITestCase):
+
+    def setUp(self):
+        caches['auth'].clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='spongebob',
+                                             phone_number='0123456789',
+                                             password='1234')
+        self.url = reverse('home:menu-list')
+
+    def login(self, device):
+        response = self.client.post(reverse('accounts:login_password'),
+                                    {'identifier':'spongebob', 'password':'1234', 'device':device},
+                                    format='json')
+        return response.data['token']
+
+    def test_logout_revokes_only_current_device(self):
+        phone, tablet = self.login('phone'), self.login('tablet')
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {phone}')
+        self.assertEqual(self.client.post(reverse('accounts:logout')).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {tablet}')
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+    def test_logout_all_devices(self):
+        phone, tablet = self.login('phone'), self.login('tablet')
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {phone}')
+        response = self.client.post(reverse('accounts:logout_all'))
+        self.assertEqual(response.data['revoked'], 2)
+
+        for key in (phone, tablet):
+            self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.login("phone")}')
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
@@ -1,16 +1,26 @@
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
-from accounts.models import User, OTPcode
+from accounts.models import User
+from accounts.otp import get_otp_store
+from accounts.flows import sign_flow, stash_secret
+from django.contrib.auth.hashers import make_password
+from django.core import signing
+from django.core.cache import caches
+from django.contrib.sessions.models import Session
 from rest_framework import status
+from django.test import override_settings
 from unittest.mock import patch
+from throttling import get_throttle_backend
 
 
 
+@override_settings(OTP_STORE='accounts.otp.CacheOTPStore')
 class TestUserRegistration(APITestCase):
 
     def setUp(self):
         self.client = APIClient()
         self.url = reverse('accounts:user_register')
+        get_throttle_backend().clear()
         self.valid_data = {
             'username': 'spongebob',
             'phone_number':'0123456789',
@@ -28,8 +38,14 @@ class TestUserRegistration(APITestCase):
         response = self.client.post(self.url, self.valid_data, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['detail'], 'user will receive a code')
-        self.assertTrue(OTPcode.objects.filter(phone_number='0123456789').exists())
-        self.assertEqual(OTPcode.objects.count(), 1)
+        self.assertIsNotNone(caches['otp'].get('otp:0123456789'))
+
+    def test_register_sends_code_asynchronously(self):
+        with patch('accounts.tasks.send_sms_task.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(self.url, self.valid_data, format='json')
+        code = caches['otp'].get('otp:0123456789')
+        delay.assert_called_once_with([['0123456789', f'Your verification code is {code}']])
 
     def test_invalid_register(self):
         response = self.client.post(self.url, self.invaild_data, format='json')
@@ -38,6 +54,7 @@ class TestUserRegistration(APITestCase):
         self.assertIn('phone_number', response.data)
 
 
+@override_settings(OTP_STORE='accounts.otp.CacheOTPStore')
 class TestUserPhoneVerify(APITestCase):
 
     def setUp(self):
@@ -46,20 +63,20 @@ class TestUserPhoneVerify(APITestCase):
         self.user_session = {
             'username':'spongeboe',
             'phone_number':'0123456789',
-            'password':'1234',
+            'secret':stash_secret(make_password('1234')),
         }
 
         self.valid_otp = 1999
         self.invalid_otp = 2347
 
-        OTPcode.objects.create(phone_number='0123456789', code=self.valid_otp)
+        caches['otp'].clear()
+        get_throttle_backend().clear()
+        get_otp_store().set('0123456789', self.valid_otp)
 
 
     def test_successful_verification(self):
 
-        session = self.client.session
-        session['user_register_session'] = self.user_session
-        session.save()
+        self.client.credentials(HTTP_X_FLOW_TOKEN=sign_flow('register', self.user_session))
 
    
         response = self.client.post(self.url, data={'code':self.valid_otp}, format='json')
@@ -67,14 +84,58 @@ class TestUserPhoneVerify(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(response.data['detail'], 'SignUp successfully')
         self.assertEqual(User.objects.count(), 1)
+        self.assertTrue(User.objects.get().check_password('1234'))
         self.assertIn('token', response.data)
 
 
+    def test_register_then_verify(self):
+        self.client.credentials()
+        data = {'username':'patrick', 'phone_number':'0987654321',
+                'password':'rock', 'password2':'rock'}
+        flow_token = self.client.post(reverse('accounts:user_register'), data,
+                                      format='json').data['flow_token']
+        code = caches['otp'].get('otp:0987654321')
+
+        self.client.credentials(HTTP_X_FLOW_TOKEN=flow_token)
+        response = self.client.post(self.url, data={'code':code}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(User.objects.get(phone_number='0987654321').check_password('rock'))
+        self.assertFalse(Session.objects.exists())
+
+    def test_flow_token_carries_no_password_hash(self):
+        self.client.credentials()
+        data = {'username':'patrick', 'phone_number':'0987654321',
+                'password':'rock', 'password2':'rock'}
+        flow_token = self.client.post(reverse('accounts:user_register'), data,
+                                      format='json').data['flow_token']
+
+        payload = signing.loads(flow_token, salt='accounts.flows.register')
+        self.assertEqual(set(payload), {'username', 'phone_number', 'secret'})
+        self.assertNotIn('$', payload['secret'])  # not a hash, which is algorithm$...
+
+    def test_stashed_password_is_used_once(self):
+        self.client.credentials(HTTP_X_FLOW_TOKEN=sign_flow('register', self.user_session))
+        self.client.post(self.url, data={'code':self.valid_otp}, format='json')
+        User.objects.all().delete()
+
+        get_otp_store().set('0123456789', self.valid_otp)
+        response = self.client.post(self.url, data={'code':self.valid_otp}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_308_PERMANENT_REDIRECT)
+        self.assertFalse(User.objects.exists())
+
+
+    def test_tampered_flow_token(self):
+        flow_token = sign_flow('register', self.user_session)
+        self.client.credentials(HTTP_X_FLOW_TOKEN=flow_token[:-1] + ('A' if flow_token[-1] != 'A' else 'B'))
+
+        response = self.client.post(self.url, data={'code':self.valid_otp}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_308_PERMANENT_REDIRECT)
+
+
     def test_fail_verification(self):
         
-        session = self.client.session
-        session['user_register_session'] = self.user_session
-        session.save()
+        self.client.credentials(HTTP_X_FLOW_TOKEN=sign_flow('register', self.user_session))
 
         response = self.client.post(self.url, data={'code':self.invalid_otp}, format='json')
 
@@ -134,6 +195,7 @@ class TestLoginPassword(APITestCase):
         self.assertIn(response.data['detail'], 'username or password is incorrect')
 
 
+@override_settings(OTP_STORE='accounts.otp.CacheOTPStore')
 class TestLoginSendCode(APITestCase):
 
     def setUp(self):
@@ -141,6 +203,7 @@ class TestLoginSendCode(APITestCase):
                                  phone_number='0123456789',
                                  password='1234')
         self.url = reverse('accounts:login_send_code')
+        get_throttle_backend().clear()
 
     def test_success_send_code(self):
         data = {
@@ -150,8 +213,7 @@ class TestLoginSendCode(APITestCase):
         response = self.client.post(self.url, data=data, format='json')
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(OTPcode.objects.count(), 1)
-        self.assertTrue(OTPcode.objects.filter(phone_number='0123456789').exists())    
+        self.assertIsNotNone(caches['otp'].get('otp:0123456789'))
         self.assertEqual(response.data['detail'], 'user will receive a code')
 
 
@@ -166,7 +228,19 @@ class TestLoginSendCode(APITestCase):
         self.assertIn(response.data['detail'], 'user not singup')
         self.assertEqual(response.data['redirect_url'], reverse('accounts:user_register'))
 
+    def test_send_code_throttled_per_client(self):
+        data = {'phone_number':'0123456789'}
+        with self.settings(THROTTLE_BURSTS={'otp': 2}):
+            for _ in range(2):
+                self.assertEqual(self.client.post(self.url, data=data, format='json').status_code,
+                                 status.HTTP_200_OK)
+            response = self.client.post(self.url, data=data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
 
+
+@override_settings(OTP_STORE='accounts.otp.CacheOTPStore')
 class TestLogiReceiveCode(APITestCase):
 
     def setUp(self):
@@ -180,18 +254,50 @@ class TestLogiReceiveCode(APITestCase):
         User.objects.create_user(username='spongebob',
                                  phone_number='0123456789',
                                  password='1234')
-        OTPcode.objects.create(phone_number='0123456789', code=self.vaild_code)
+        caches['otp'].clear()
+        get_throttle_backend().clear()
+        get_otp_store().set('0123456789', self.vaild_code)
     
     
     def test_success_verify(self):
-        session = self.client.session
-        session['user_phone_number'] = {'user_phone': '0123456789'}  
-        session.save()
+        self.client.credentials(HTTP_X_FLOW_TOKEN=sign_flow('login', {'user_phone': '0123456789'}))
+
+        response = self.client.post(self.url, data={'code': self.vaild_code}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('token', response.data)
+
+    def test_verify_throttled_per_phone_number(self):
+        self.client.credentials(HTTP_X_FLOW_TOKEN=sign_flow('login', {'user_phone': '0123456789'}))
+        with self.settings(THROTTLE_BURSTS={'otp_verify': 3}):
+            for address in ('10.0.0.1', '10.0.0.2', '10.0.0.3'):
+                self.client.post(self.url, data={'code': self.invalid_code}, format='json',
+                                 REMOTE_ADDR=address)
+            # Another address does not help, and neither does the right code.
+            response = self.client.post(self.url, data={'code': self.vaild_code}, format='json',
+                                        REMOTE_ADDR='10.0.0.4')
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+    @override_settings(OTP_STORE='accounts.otp.DatabaseOTPStore')
+    def test_success_verify_with_database_store(self):
+        get_otp_store().set('0123456789', self.vaild_code)
+        self.client.credentials(HTTP_X_FLOW_TOKEN=sign_flow('login', {'user_phone': '0123456789'}))
 
         response = self.client.post(self.url, data={'code': self.vaild_code}, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('token', response.data)
 
+    def test_expired_flow_token(self):
+        response = self.client.post(self.url, data={'code': self.vaild_code}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_308_PERMANENT_REDIRECT)
+        self.assertEqual(response.data['redirect_url'], reverse('accounts:login_send_code'))
+
+    def test_flow_token_of_another_flow(self):
+        self.client.credentials(HTTP_X_FLOW_TOKEN=sign_flow('register', {'user_phone': '0123456789'}))
+        response = self.client.post(self.url, data={'code': self.vaild_code}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_308_PERMANENT_REDIRECT)
+
 
 class TestLogoutView(APITestCase):
 
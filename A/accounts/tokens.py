@@ -0,0 +1,127 @@
+import hashlib
+import secrets
+import time
+from collections import namedtuple
+from datetime import timedelta
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from .models import AuthToken, User
+
+
+SALT = 'accounts.tokens'
+
+AccessToken = namedtuple('AccessToken', ['user_id', 'device', 'key_hash', 'issued_at'])
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def hash_token(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _cache():
+    return caches[settings.AUTH_TOKEN_STORE_ALIAS]
+
+
+def _valid_key(key_hash):
+    return f'valid:{key_hash}'
+
+
+def _revoked_before_key(user_id):
+    return f'revoked_before:{user_id}'
+
+
+def _user_key(user_id):
+    return f'user:{user_id}'
+
+
+def issue_token(user, device='default'):
+    """
+    Issues a token for one device of `user`, replacing that device's previous token.
+    Returns `(key, expires_at)`; `key` is what the client sends in the Authorization
+    header and is never stored, only its hash.
+    """
+    issued_at = time.time()
+    key = signing.dumps({'u': user.pk, 'd': device, 'i': issued_at, 'n': secrets.token_urlsafe(8)},
+                        salt=SALT)
+    key_hash = hash_token(key)
+    expires_at = timezone.now() + timedelta(seconds=settings.AUTH_TOKEN_TTL)
+
+    with transaction.atomic():
+        previous = AuthToken.objects.select_for_update().filter(user=user, device=device).first()
+        if previous is not None:
+            _cache().delete(_valid_key(previous.key_hash))
+            previous.delete()
+        AuthToken.objects.create(user=user, device=device, key_hash=key_hash, expires_at=expires_at)
+    return key, expires_at
+
+
+def verify_token(key):
+    """
+    Returns the `(user, AccessToken)` of a valid token, or raises `InvalidToken`.
+
+    The signature and age of the token are checked locally, then one cache round trip
+    fetches the user's revocation time, whether the token is known to exist and the
+    user itself. The database is only read when the cache does not know the token or
+    the user yet, e.g. right after a restart.
+    """
+    try:
+        payload = signing.loads(key, salt=SALT, max_age=settings.AUTH_TOKEN_TTL)
+        access = AccessToken(payload['u'], payload['d'], hash_token(key), payload['i'])
+    except (signing.BadSignature, KeyError, TypeError):
+        raise InvalidToken('Invalid token.')
+
+    cache = _cache()
+    keys = [_revoked_before_key(access.user_id), _valid_key(access.key_hash), _user_key(access.user_id)]
+    cached = cache.get_many(keys)
+
+    revoked_before = cached.get(keys[0])
+    if revoked_before is not None and access.issued_at <= revoked_before:
+        raise InvalidToken('Token has been revoked.')
+
+    if keys[1] not in cached:
+        if not AuthToken.objects.filter(key_hash=access.key_hash, expires_at__gt=timezone.now()).exists():
+            raise InvalidToken('Token has been revoked.')
+        cache.set(keys[1], 1, timeout=settings.AUTH_TOKEN_VERIFY_CACHE_TTL)
+
+    user = cached.get(keys[2])
+    if user is None:
+        try:
+            user = User.objects.get(pk=access.user_id)
+        except User.DoesNotExist:
+            raise InvalidToken('Invalid token.')
+        cache.set(keys[2], user, timeout=settings.AUTH_TOKEN_VERIFY_CACHE_TTL)
+
+    return user, access
+
+
+def revoke_token(access):
+    """
+    Revokes a single token, given the `AccessToken` returned by `verify_token`.
+    """
+    deleted, _ = AuthToken.objects.filter(key_hash=access.key_hash).delete()
+    _cache().delete(_valid_key(access.key_hash))
+    return deleted
+
+
+def revoke_all_tokens(user):
+    """
+    Revokes every token of `user` with a single DELETE. Tokens issued until now are
+    rejected right away through the user's revocation time in the cache, without
+    having to find and evict each of them.
+    """
+    _cache().set(_revoked_before_key(user.pk), time.time(), timeout=settings.AUTH_TOKEN_TTL)
+    deleted, _ = AuthToken.objects.filter(user=user).delete()
+    return deleted
+
+
+def forget_user(user_id):
+    """
+    Drops the cached copy of a user, e.g. after it was changed or deactivated.
+    """
+    _cache().delete(_user_key(user_id))
@@ -11,6 +11,7 @@ urlpatterns = [
     path('logine_send_code/', views.UserLoginSendCode.as_view(), name='login_send_code'),
     path('login_receive_code/', views.UserLoginReceiveCode.as_view(), name='login_receive_code'),
     path('logout/', views.UserLogoutView.as_view(), name='logout'),
+    path('logout/all/', views.UserLogoutAllView.as_view(), name='logout_all'),
     path('update_account/<int:pk>/', views.UserUpdateProfile.as_view(), name='profile_update'),
 
     
@@ -1,29 +1,34 @@
-import random
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
 from rest_framework.views import APIView
-from .models import User, OTPcode
+from .models import User
 from . import serializer
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from utils import send_otp_code
+from .sms import send_otp_code
+from .otp import get_otp_store
+from .flows import sign_flow, read_flow, stash_secret, pop_secret
 from django.urls import reverse
 from rest_framework.authtoken.models import Token
+from .tokens import AccessToken, issue_token, revoke_token, revoke_all_tokens
+from throttling import OTPRateThrottle, OTPVerifyRateThrottle
 
 
 class UserRegisterView(APIView):
     
     """
-    Handles user registration by validating user input, saving the data to a session,
+    Handles user registration by validating user input, signing the data into a flow token,
     generating a one-time password (OTP), and sending the OTP to the user's phone number.
 
     Methods:
         post(request):
             - Validates the incoming user registration data using `UserSerializer`.
-            - Stores the validated data (`username`, `phone_number`, `password`) in a session.
-            - Generates a random 4-digit OTP.
-            - Creates an OTPcode instance to store the generated code and the user's phone number.
-            - Sends the OTP to the provided phone number using the `send_otp_code` function.
+            - Signs `username` and `phone_number` into a flow token, so no session row is
+              written. The hashed `password` is stashed server-side and only referenced
+              from the token by a nonce, since the token is readable by the client.
+            - Issues a random 4-digit OTP for the phone number through the configured OTP store.
+            - Queues the OTP for asynchronous delivery using the `send_otp_code` function.
             - Returns a 200 OK response with a success message if the data is valid.
             - Returns a 400 BAD REQUEST response with validation errors if the data is invalid.
 
@@ -39,28 +44,29 @@ class UserRegisterView(APIView):
         }
 
     Responses:
-        - 200 OK: {'detail': 'user will receive a code'}
+        - 200 OK: {'detail': 'user will receive a code', 'flow_token': 'string'}
+          `flow_token` must be sent back in the `X-Flow-Token` header to `phone_verify`.
         - 400 BAD REQUEST: {validation_errors}
     """
 
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [OTPRateThrottle]
 
     def post(self, request):
         serz_data = serializer.UserSerializer(data=request.data)
         if serz_data.is_valid():
 
-            request.session['user_register_session'] = {
+            # Only a nonce goes into the readable token; the hash stays server-side.
+            flow_token = sign_flow('register', {
                 'username':serz_data.validated_data['username'],
                 'phone_number':serz_data.validated_data['phone_number'],
-                'password':serz_data.validated_data['password']
-            }
-            random_code = random.randint(1000, 9999)
+                'secret':stash_secret(make_password(serz_data.validated_data['password']))
+            })
             phone_number=serz_data.validated_data['phone_number']
-            OTPcode.objects.create(
-                phone_number=phone_number,
-                code = random_code)
-            send_otp_code(phone_number, random_code)
-            return Response({'detail':'user will receive a code'}, status=status.HTTP_200_OK)
+            code = get_otp_store().issue(phone_number)
+            send_otp_code(phone_number, code)
+            return Response({'detail':'user will receive a code', 'flow_token':flow_token},
+                            status=status.HTTP_200_OK)
         
         return Response(serz_data.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -73,9 +79,9 @@ class UserPhoneVerfiy(APIView):
     and completing the user registration process.
 
     This view validates the OTP code provided by the user and, if the code is 
-    correct, creates a new user using the information stored in the session. 
-    If the session has expired or the code is incorrect, appropriate error responses 
-    are returned.
+    correct, creates a new user using the information signed into the registration 
+    flow token. If the flow token has expired or the code is incorrect, appropriate 
+    error responses are returned.
 
     Permissions:
         - AllowAny: No authentication or authorization is required.
@@ -84,47 +90,55 @@ class UserPhoneVerfiy(APIView):
         - POST: Validate the OTP code and register the user if valid.
 
     Behavior:
-        1. Checks for a valid user registration session (user_register_session) 
-           in the request session.
+        1. Checks for a valid registration flow token in the `X-Flow-Token` header.
         2. Validates the provided OTP code against the code stored for the user's 
-           phone number.
-        3. Creates a new user using the details stored in the session and deletes 
-           the OTP code upon successful validation.
-        4. Returns a response with a token for the registered user if the 
-           verification is successful.
-        5. Handles errors such as invalid/expired OTP codes or missing session data.
+           phone number, consuming it so it cannot be used twice.
+        3. Creates a new user using the details signed into the flow token and the
+           password hash stashed for it.
+        4. Returns a response with an expiring token for the registered user's device 
+           (optional `device` field) if the verification is successful.
+        5. Handles errors such as invalid/expired OTP codes or a missing flow token.
 
     Responses:
         - 201 Created: OTP verified successfully, and user has been registered.
-        - 400 Bad Request: The OTP code is invalid or errors in the serializer.
-        - 308 Permanent Redirect: Session expired; prompts the user to restart the 
-          registration process.
-        - 404 Not Found: The OTP code does not exist.
+        - 400 Bad Request: The OTP code is invalid or expired, or errors in the serializer.
+        - 308 Permanent Redirect: Flow token missing or expired; prompts the user to restart 
+          the registration process.
+        - 429 Too Many Requests: Too many attempts for the phone number (`otp_verify` rate).
 
     """
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [OTPVerifyRateThrottle]
+
+    def get_otp_phone_number(self, request):
+        flow = read_flow(request, 'register')
+        return flow['phone_number'] if flow else None
 
     def post(self, request):
-        user_session = request.session.get('user_register_session')
-        if user_session:
+        flow = read_flow(request, 'register')
+        if flow:
 
-            user_phone = user_session['phone_number']
+            user_phone = flow['phone_number']
             serz_data = serializer.OTPserializer(data=request.data)
             
             if serz_data.is_valid():
-                user_code = OTPcode.objects.get(phone_number=user_phone)
             
-                if user_code.code == serz_data.validated_data['code']:
-                    user = User.objects.create_user(
-                        phone_number=user_session['phone_number'],
-                        username=user_session['username'],
-                        password=user_session['password']
+                if get_otp_store().verify(user_phone, serz_data.validated_data['code']):
+                    # The password was hashed and stashed when the flow token was signed.
+                    password = pop_secret(flow['secret'])
+                    if password is None:
+                        return Response({'detail':'session is expired redirect to user_register',
+                                         'redirect link':reverse('accounts:user_register')},
+                                        status=status.HTTP_308_PERMANENT_REDIRECT)
+                    user = User.objects.create(
+                        phone_number=flow['phone_number'],
+                        username=flow['username'],
+                        password=password
                     )
-                    request.session.delete()
-                    user_code.delete()
-                    token, _ = Token.objects.get_or_create(user=user)
+                    token, expires_at = issue_token(user, serz_data.validated_data['device'])
 
-                    return Response({'detail':'SignUp successfully', 'token':token.key}, status=status.HTTP_201_CREATED)
+                    return Response({'detail':'SignUp successfully', 'token':token,
+                                     'expires_at':expires_at}, status=status.HTTP_201_CREATED)
                 
                 return Response({'detail':'the code is incorrect'}, status=status.HTTP_400_BAD_REQUEST)
             
@@ -157,7 +171,8 @@ class UserLoginPassword(APIView):
         1. Validates the input data using the `UserloginPasswordSerializer`.
         2. Authenticates the user using the `authenticate` method with the provided 
            identifier and password.
-        3. Generates a token for the authenticated user and returns it upon successful login.
+        3. Issues an expiring token for the device named by the optional `device` field 
+           (replacing that device's previous token) and returns it upon successful login.
         4. Handles errors such as incorrect username/password or invalid input data.
 
     Responses:
@@ -177,9 +192,9 @@ class UserLoginPassword(APIView):
             user = authenticate(request, identifier=identifier, password=password)
             if user:
                 
-                token, _ = Token.objects.get_or_create(user=user)
+                token, expires_at = issue_token(user, serz_data.validated_data['device'])
                 
-                return Response({'token':token.key}, status=status.HTTP_200_OK)
+                return Response({'token':token, 'expires_at':expires_at}, status=status.HTTP_200_OK)
             
             return Response({'detail':'username or password is incorrect'}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -207,19 +222,22 @@ class UserLoginSendCode(APIView):
     Behavior:
         1. Validates the provided phone number using `UserLoginSendCodeSerializer`.
         2. Checks if a user with the provided phone number exists in the database.
-        3. Generates a random 4-digit OTP code and stores it in the `OTPcode` model.
-        4. Sends the OTP code to the user via the `send_otp_code` function.
-        5. Saves the phone number in the session for use in subsequent steps.
+        3. Issues a random 4-digit OTP code through the configured OTP store.
+        4. Queues the OTP code for asynchronous delivery via the `send_otp_code` function.
+        5. Signs the phone number into a flow token for use in subsequent steps.
         6. Redirects users without an existing account to the registration endpoint.
 
     Responses:
-        - 200 OK: OTP code generated and sent successfully.
+        - 200 OK: OTP code generated and sent successfully. The response's `flow_token` 
+          must be sent back in the `X-Flow-Token` header to `login_receive_code`.
         - 308 Permanent Redirect: Phone number not found; user needs to register.
         - 400 Bad Request: Validation errors in the input data.
+        - 429 Too Many Requests: The client exceeded the `otp` rate.
 
     """
 
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [OTPRateThrottle]
 
     def post(self, request):
         serz_date = serializer.UserLoginSendCodeSerializer(data=request.data)
@@ -229,17 +247,12 @@ class UserLoginSendCode(APIView):
             user = User.objects.filter(phone_number=user_phone).exists()
             if user:
                
-                random_code = random.randint(1000,9999)
-                OTPcode.objects.create(
-                    phone_number=user_phone,
-                    code=random_code
-                )
-                send_otp_code(user_phone, random_code)
-                request.session['user_phone_number'] = {
-                    'user_phone':user_phone
-                }
-
-                return Response({'detail':'user will receive a code'}, status=status.HTTP_200_OK)
+                code = get_otp_store().issue(user_phone)
+                send_otp_code(user_phone, code)
+                flow_token = sign_flow('login', {'user_phone':user_phone})
+
+                return Response({'detail':'user will receive a code', 'flow_token':flow_token},
+                                status=status.HTTP_200_OK)
             
             redirect_url = reverse('accounts:user_register')
             return Response({'detail':'user not singup', 'redirect_url':redirect_url}, status=status.HTTP_308_PERMANENT_REDIRECT)
@@ -256,8 +269,8 @@ class UserLoginReceiveCode(APIView):
 
     This view allows users to submit an OTP code for authentication. If the OTP code matches 
     the one sent to the user's phone number, the user is authenticated, and a token is generated 
-    for subsequent API requests. If the OTP is incorrect, expired, or the session has expired, 
-    appropriate error responses are returned.
+    for subsequent API requests. If the OTP is incorrect, expired, or the login flow token 
+    has expired, appropriate error responses are returned.
 
     Permissions:
         - AllowAny: No authentication or authorization is required to access this endpoint.
@@ -267,20 +280,30 @@ class UserLoginReceiveCode(APIView):
 
     Behavior:
         1. Validates the provided OTP code using `UserLoginReceiveCodeSerializer`.
-        2. Checks if there is a valid session containing the phone number.
+        2. Checks for a valid login flow token, sent in the `X-Flow-Token` header, carrying 
+           the phone number.
         3. Verifies the submitted OTP against the stored OTP code for the user's phone number.
-        4. Authenticates the user and generates an authentication token upon success.
-        5. Cleans up session data and deletes the OTP code after successful login.
-        6. Handles errors such as expired sessions, invalid OTP codes, or missing session data.
+        4. Authenticates the user and issues an expiring token for the device named by the 
+           optional `device` field upon success.
+        5. The OTP code is consumed by the verification itself, so the flow token cannot 
+           be replayed.
+        6. Handles errors such as expired flow tokens or invalid OTP codes.
 
     Responses:
         - 200 OK: OTP verified successfully; user is authenticated and a token is provided.
         - 400 Bad Request: Invalid OTP code or validation errors.
-        - 308 Permanent Redirect: Session expired; prompts the user to restart the login process.
+        - 308 Permanent Redirect: Flow token missing or expired; prompts the user to restart 
+          the login process.
+        - 429 Too Many Requests: Too many attempts for the phone number (`otp_verify` rate).
 
     """
 
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [OTPVerifyRateThrottle]
+
+    def get_otp_phone_number(self, request):
+        flow = read_flow(request, 'login')
+        return flow.get('user_phone') if flow else None
 
     def post(self, request):
         serz_data = serializer.UserLoginReceiveCodeSerializer(data=request.data)
@@ -288,23 +311,20 @@ class UserLoginReceiveCode(APIView):
            
 
             code = serz_data.validated_data.get('code')
-            user_session = request.session.get('user_phone_number')
-            if user_session:
+            flow = read_flow(request, 'login')
+            if flow:
                 
-                user_phone = user_session.get('user_phone')
-                user_code = OTPcode.objects.get(phone_number=user_phone)
-                if code == user_code.code:
+                user_phone = flow.get('user_phone')
+                if get_otp_store().verify(user_phone, code):
 
                     user = get_object_or_404(User, phone_number=user_phone)
-                    token, _ = Token.objects.get_or_create(user=user)
-                    request.session.delete()
-                    user_code.delete()
+                    token, expires_at = issue_token(user, serz_data.validated_data['device'])
                     
-                    return Response({'token':token.key}, status=status.HTTP_200_OK)
+                    return Response({'token':token, 'expires_at':expires_at}, status=status.HTTP_200_OK)
                 
                 return Response({'detail':'Invalid or expired code'})
             
-            redirect_url = reverse('accounts:logine_send_code')
+            redirect_url = reverse('accounts:login_send_code')
             return Response({'detail':'Session expired redirect to logine_send_code',
                              'redirect_url':redirect_url}, status=status.HTTP_308_PERMANENT_REDIRECT)
         
@@ -317,10 +337,10 @@ class UserLogoutView(APIView):
     """
     API endpoint for logging out an authenticated user.
 
-    This view invalidates the user's authentication token, effectively logging them out. 
-    It requires the user to be authenticated before accessing the endpoint. If the token 
-    exists, it is deleted, and a confirmation message is returned. If the token does not 
-    exist, an error response is provided.
+    This view revokes the authentication token of the current device, effectively logging 
+    it out. It requires the user to be authenticated before accessing the endpoint. If the 
+    token exists, it is deleted, and a confirmation message is returned. If the token does 
+    not exist, an error response is provided.
 
     Permissions:
         - IsAuthenticated: The user must be logged in to access this endpoint.
@@ -329,8 +349,8 @@ class UserLogoutView(APIView):
         - POST: Invalidate the authentication token and log the user out.
 
     Behavior:
-        1. Retrieves the user's token using the `Token` model and their authentication details.
-        2. Deletes the token, logging the user out.
+        1. Identifies the token the request was authenticated with.
+        2. Revokes the token, logging the device out; it is also dropped from the token caches.
         3. Returns appropriate messages and HTTP status codes based on whether the token exists.
 
     Responses:
@@ -341,14 +361,43 @@ class UserLogoutView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
-        token, _ = Token.objects.get(user=request.user)
-        if token:
-            del token
+        if isinstance(request.auth, AccessToken):
+            deleted = revoke_token(request.auth)
+        else:
+            deleted, _ = Token.objects.filter(user=request.user).delete()
+        if deleted:
             return Response({'detail':'user has been loged out'}, status=status.HTTP_200_OK)
         
         return Response({'detail':'user not loged in'}, status=status.HTTP_404_NOT_FOUND)
 
 
+class UserLogoutAllView(APIView):
+
+    """
+    API endpoint for logging a user out of every device at once.
+
+    All tokens of the user are revoked with a single DELETE, and tokens issued until now 
+    are rejected right away through the revocation time kept in the cache.
+
+    Permissions:
+        - IsAuthenticated: The user must be logged in to access this endpoint.
+
+    HTTP Methods:
+        - POST: Revoke every token of the user.
+
+    Responses:
+        - 200 OK: `{'detail': ..., 'revoked': <number of tokens revoked>}`.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        revoked = revoke_all_tokens(request.user)
+        revoked += Token.objects.filter(user=request.user).delete()[0]
+        return Response({'detail':'user has been loged out of all devices', 'revoked':revoked},
+                        status=status.HTTP_200_OK)
+
+
 class UserUpdateProfile(APIView):
 
     """
@@ -1,29 +1,106 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import boto3
 import boto3.session
 from django.conf import settings
 
 
+# S3 accepts at most 1000 keys per DeleteObjects request.
+MAX_DELETE_KEYS = 1000
+
+
 class Bucket:
 
+    """
+    Thin wrapper around the S3-compatible bucket.
+
+    The boto3 client is built lazily on first use with `AWS_S3_CLIENT_CONFIG` (connection
+    pool size, keep-alive, timeouts and retries with backoff) and rebuilt in every forked
+    child, so Celery prefork workers never share sockets with their parent. A client is
+    thread-safe, so one per process is shared by all threads and by the batch helpers.
+    """
+
     def __init__(self):
-        session = boto3.session.Session()
-        self.connection = session.client(
-            service_name = settings.AWS_SERVICE_NAME ,
-            aws_access_key_id = settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key = settings.AWS_SECRET_ACCESS_KEY,
-            endpoint_url = settings.AWS_S3_ENDPOINT_URL
-        )
-    def get_all_objects(self):
-        result = self.connection.list_objects_v2(Bucket=settings.AWS_STORAGE_BUCKET_NAME)
-        if result['KeyCount']:
-            return result['Contents']
-        return None
-    
+        self._connection = None
+        self._lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._connection = None
+        self._lock = threading.Lock()
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            with self._lock:
+                if self._connection is None:
+                    session = boto3.session.Session()
+                    self._connection = session.client(
+                        service_name = settings.AWS_SERVICE_NAME ,
+                        aws_access_key_id = settings.AWS_ACCESS_KEY_ID,
+                        aws_secret_access_key = settings.AWS_SECRET_ACCESS_KEY,
+                        endpoint_url = settings.AWS_S3_ENDPOINT_URL,
+                        config = settings.AWS_S3_CLIENT_CONFIG
+                    )
+        return self._connection
+
+    def iter_objects(self, prefix='', page_size=1000):
+        """
+        Lazily yields every object under `prefix`, following continuation tokens one
+        page at a time so any number of keys can be walked in constant memory.
+        Objects are yielded in the bucket's lexicographic key order.
+        """
+        paginator = self.connection.get_paginator('list_objects_v2')
+        pages = paginator.paginate(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Prefix=prefix,
+                                   PaginationConfig={'PageSize': page_size})
+        for page in pages:
+            yield from page.get('Contents', [])
+
+
+    def put_object(self, key, body, content_type=None, cache_control=None):
+        extra = {}
+        if content_type:
+            extra['ContentType'] = content_type
+        if cache_control:
+            extra['CacheControl'] = cache_control
+        self.connection.put_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key,
+                                   Body=body, **extra)
+        return True
 
     def delete_object(self, key):
          self.connection.delete_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key)
          return True
 
+    def delete_objects(self, keys):
+        """
+        Deletes `keys` with multi-object delete requests of up to `MAX_DELETE_KEYS` keys,
+        sent concurrently. Returns the keys the bucket failed to delete.
+        """
+        keys = list(keys)
+        batches = [keys[start:start + MAX_DELETE_KEYS]
+                   for start in range(0, len(keys), MAX_DELETE_KEYS)]
+        failed = []
+        for errors in self.map_concurrently(self._delete_batch, batches):
+            failed.extend(errors)
+        return failed
+
+    def _delete_batch(self, keys):
+        result = self.connection.delete_objects(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True}
+        )
+        return [error['Key'] for error in result.get('Errors', [])]
+
+    def map_concurrently(self, func, items):
+        # A single request, e.g. one batch of up to 1000 keys, needs no thread pool.
+        if len(items) <= 1:
+            return [func(item) for item in items]
+        workers = min(len(items), settings.AWS_S3_MAX_POOL_CONNECTIONS)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(func, items))
+
 
 bucket = Bucket()
-        
\ No newline at end of file
+
@@ -11,8 +11,9 @@ class MenuItemInline(admin.TabularInline):
 class MenuAdmin(admin.ModelAdmin):
     inlines = [MenuItemInline]
     fields = [
-         'user', 'title', 'description', 'qr_code'
+         'user', 'title', 'description', 'qr_code', 'qr_status'
     ]
+    readonly_fields = ['qr_status']
 
 
 
@@ -0,0 +1,103 @@
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+
+
+class MenuCache:
+    """
+    Read-through cache for the public menu documents served by `FetchMenu`.
+
+    Documents are keyed by menu id and a per-menu version number. Invalidating a
+    menu bumps its version, so every document cached for the old version becomes
+    unreachable at once on all processes sharing the backend and simply expires.
+    Version keys expire like the documents, so deleted or unknown menus leave nothing
+    behind.
+    The backend is the Django cache named by `MENU_CACHE_ALIAS`.
+    """
+
+    def __init__(self, alias=None):
+        self.alias = alias or settings.MENU_CACHE_ALIAS
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def version_key(self, menu_id):
+        return f"menu:{menu_id}:version"
+
+    def document_key(self, menu_id, version):
+        return f"menu:{menu_id}:v{version}"
+
+    def new_version(self):
+        # From the clock rather than 1 so an expired or evicted version key can never
+        # make documents cached under an older version reachable again.
+        return time.time_ns() // 1000
+
+    def get_version(self, menu_id):
+        key = self.version_key(menu_id)
+        version = self.backend.get(key)
+        if version is None:
+            self.backend.add(key, self.new_version(), timeout=settings.MENU_CACHE_TIMEOUT)
+            version = self.backend.get(key)
+        return version
+
+    def get_or_build(self, menu_id, builder):
+        key = self.version_key(menu_id)
+        version = self.backend.get(key)
+        if version is not None:
+            document = self.backend.get(self.document_key(menu_id, version))
+            if document is not None:
+                self._count(hit=True)
+                return document
+
+        self._count(hit=False)
+        # Built before any key is written, so probing unknown menu ids stores nothing.
+        document = builder(menu_id)
+        if version is None:
+            version = self.new_version()
+            if not self.backend.add(key, version, timeout=settings.MENU_CACHE_TIMEOUT):
+                # A concurrent write created the version; the document may predate it.
+                return document
+        self.backend.set(self.document_key(menu_id, version), document,
+                         timeout=settings.MENU_CACHE_TIMEOUT)
+        return document
+
+    def set(self, menu_id, document, version):
+        # `version` is the one returned by `invalidate`, not re-read here: a slower
+        # concurrent refresh must not store its older document under a newer version.
+        self.backend.set(self.document_key(menu_id, version), document,
+                         timeout=settings.MENU_CACHE_TIMEOUT)
+
+    def invalidate(self, menu_id):
+        """
+        Bumps the version of a menu and returns the new one.
+        """
+        key = self.version_key(menu_id)
+        try:
+            return self.backend.incr(key)
+        except ValueError:
+            version = self.new_version()
+            self.backend.set(key, version, timeout=settings.MENU_CACHE_TIMEOUT)
+            return version
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+        }
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+
+menu_cache = MenuCache()
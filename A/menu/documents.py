@@ -0,0 +1,138 @@
+import hashlib
+import json
+from collections import namedtuple
+from django.conf import settings
+from django.db import transaction
+from django.db.models import FilteredRelation, Q
+from django.http import Http404
+from django.template.loader import render_to_string
+from .cache import menu_cache
+from .publishers import get_publisher, snapshot_key
+from .models import QRMenu
+
+
+MenuDocument = namedtuple('MenuDocument', ['body', 'etag'])
+
+
+MENU_FIELDS = ('id', 'title', 'description')
+ITEM_FIELDS = ('id', 'item', 'description', 'price')
+
+
+def fetch_menu_rows(menu_id):
+    """
+    Fetches a menu and its available items in one round trip: a LEFT JOIN onto the
+    available items yields one row per item, or a single row with NULL item columns
+    for a menu without any.
+    """
+    return (QRMenu.objects.filter(id=menu_id)
+            .annotate(available_items=FilteredRelation('items',
+                                                       condition=Q(items__available=True)))
+            .order_by('available_items__id')
+            .values_list(*MENU_FIELDS, *(f'available_items__{field}' for field in ITEM_FIELDS)))
+
+
+def serialize_menu_rows(rows):
+    """
+    Builds the `FetchMenu` document from `fetch_menu_rows` tuples. Produces the same
+    fields as `QRMenuSerializer` and `MenuItemSerializer` without their per-field overhead.
+    """
+    menu_size = len(MENU_FIELDS)
+    return {
+        'menu': dict(zip(MENU_FIELDS, rows[0][:menu_size])),
+        'items': [dict(zip(ITEM_FIELDS, row[menu_size:])) for row in rows
+                  if row[menu_size] is not None],
+    }
+
+
+def build_menu_document(menu_id):
+    """
+    Serializes a menu and its available items into the JSON bytes returned by
+    `FetchMenu`, along with a strong ETag derived from those bytes.
+    """
+    rows = list(fetch_menu_rows(menu_id))
+    if not rows:
+        raise Http404('No QRMenu matches the given query.')
+
+    body = json.dumps(serialize_menu_rows(rows), ensure_ascii=False,
+                      separators=(',', ':')).encode('utf-8')
+    etag = '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+    return MenuDocument(body=body, etag=etag)
+
+
+def get_menu_document(menu_id):
+    return menu_cache.get_or_build(menu_id, build_menu_document)
+
+
+def refresh_menu_document(menu_id):
+    """
+    Invalidates the cached document of a menu and materializes the new one right
+    away, so the next scan is served from the cache instead of rebuilding it.
+    """
+    version = menu_cache.invalidate(menu_id)
+    try:
+        document = build_menu_document(menu_id)
+    except Http404:
+        return None
+
+    menu_cache.set(menu_id, document, version)
+    return document
+
+
+def publish_menu(menu_id, publisher=None):
+    """
+    Exports the menu document as a static JSON (and, with `MENU_PUBLISH_HTML`, HTML)
+    snapshot through the configured publisher. Snapshots of deleted menus are removed.
+
+    The document is built from the database rather than read through the menu cache:
+    a worker's cache may not see the version bump made by the web process that changed
+    the menu, and would republish a stale copy.
+    """
+    publisher = publisher or get_publisher()
+    try:
+        document = build_menu_document(menu_id)
+    except Http404:
+        publisher.unpublish([snapshot_key(menu_id, 'json'), snapshot_key(menu_id, 'html')])
+        return None
+
+    publisher.publish(snapshot_key(menu_id, 'json'), document.body, 'application/json')
+    if settings.MENU_PUBLISH_HTML:
+        html = render_to_string('menu/menu_snapshot.html', json.loads(document.body))
+        publisher.publish(snapshot_key(menu_id, 'html'), html.encode('utf-8'),
+                          'text/html; charset=utf-8')
+    return document
+
+
+def menu_changed(menu_id):
+    """
+    Called from the write paths: refreshes the menu document once the current
+    transaction commits, so the pre-commit rows are never materialized, and queues
+    the menu for republishing when publish mode is on.
+    """
+    from . import tasks
+
+    def refresh():
+        refresh_menu_document(menu_id)
+        if settings.MENU_PUBLISH_ENABLED:
+            tasks.publish_menu_task.delay(menu_id)
+
+    transaction.on_commit(refresh)
+
+
+def menus_changed(menu_ids):
+    """
+    Lighter variant of `menu_changed` for writes that touch many menus at once, such
+    as availability toggles during service: the cached documents are only invalidated
+    after commit and rebuilt by the next read, keeping the write request short.
+    """
+    from . import tasks
+
+    menu_ids = list(menu_ids)
+
+    def invalidate():
+        for menu_id in menu_ids:
+            menu_cache.invalidate(menu_id)
+            if settings.MENU_PUBLISH_ENABLED:
+                tasks.publish_menu_task.delay(menu_id)
+
+    if menu_ids:
+        transaction.on_commit(invalidate)
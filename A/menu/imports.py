@@ -0,0 +1,95 @@
+import csv
+import json
+from django.conf import settings
+from django.db import transaction
+from .models import MenuItem
+from .serializers import MenuItemSerializer
+
+
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/jsonl', 'application/json-seq')
+CSV_CONTENT_TYPES = ('text/csv',)
+
+
+class UnsupportedImportFormat(Exception):
+    pass
+
+
+def decode_lines(stream, bad_lines):
+    """
+    Yields the lines of a binary stream as text. Lines that are not valid UTF-8 are
+    decoded with replacement characters and their numbers added to `bad_lines`.
+    """
+    for line_number, line in enumerate(iter(stream.readline, b''), start=1):
+        try:
+            yield line.decode('utf-8')
+        except UnicodeDecodeError:
+            bad_lines.add(line_number)
+            yield line.decode('utf-8', errors='replace')
+
+
+def iter_rows(stream, content_type):
+    """
+    Lazily yields `(line_number, row)` pairs from an NDJSON or CSV request body, reading
+    it line by line. `row` is `None` for lines that could not be decoded.
+    """
+    bad_lines = set()
+    lines = decode_lines(stream, bad_lines)
+    media_type = content_type.split(';')[0].strip().lower()
+
+    if media_type in CSV_CONTENT_TYPES:
+        reader = csv.DictReader(lines)
+        last_line = reader.line_num
+        for row in reader:
+            # A quoted field can span several lines; any undecodable one spoils the row.
+            if any(line_number in bad_lines for line_number in range(last_line + 1,
+                                                                     reader.line_num + 1)):
+                row = None
+            last_line = reader.line_num
+            yield reader.line_num, row
+
+    elif media_type in NDJSON_CONTENT_TYPES:
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = None if line_number in bad_lines else json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else None
+
+    else:
+        raise UnsupportedImportFormat(media_type)
+
+
+def import_menu_items(menu, rows, batch_size=None):
+    """
+    Validates `rows` one at a time with `MenuItemSerializer` and inserts the valid ones
+    with `bulk_create` in chunks of `batch_size`, so only one chunk is held in memory.
+    Invalid rows are skipped and reported; a database error rolls the whole import back.
+    """
+    batch_size = batch_size or settings.MENU_IMPORT_BATCH_SIZE
+    max_errors = settings.MENU_IMPORT_MAX_ERRORS
+    result = {'created': 0, 'error_count': 0, 'errors': []}
+    batch = []
+
+    with transaction.atomic():
+        for line_number, row in rows:
+            serz_data = MenuItemSerializer(data=row) if row is not None else None
+            if serz_data is None or not serz_data.is_valid():
+                result['error_count'] += 1
+                if len(result['errors']) < max_errors:
+                    errors = serz_data.errors if serz_data is not None else 'malformed row'
+                    result['errors'].append({'line': line_number, 'errors': errors})
+                continue
+
+            batch.append(MenuItem(menu=menu, **serz_data.validated_data))
+            if len(batch) >= batch_size:
+                MenuItem.objects.bulk_create(batch, batch_size=batch_size)
+                result['created'] += len(batch)
+                batch = []
+
+        if batch:
+            MenuItem.objects.bulk_create(batch, batch_size=batch_size)
+            result['created'] += len(batch)
+
+    return result
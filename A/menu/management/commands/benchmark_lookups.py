@@ -0,0 +1,142 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from accounts.models import User, OTPcode
+from menu.models import QRMenu, MenuItem
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Seeds large menu, item and OTP tables inside a transaction that is rolled back, '
+            'then prints EXPLAIN plans and latencies of the hot lookups with the lookup '
+            'indexes and with the baseline foreign key indexes they replaced.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--menus-per-user', type=int, default=5)
+        parser.add_argument('--items-per-menu', type=int, default=50)
+        parser.add_argument('--otps', type=int, default=200000)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.options = options
+        try:
+            with transaction.atomic():
+                self.seed()
+                after = self.run_queries()
+                self.drop_indexes()
+                before = self.run_queries()
+                self.report(before, after)
+                raise Rollback
+        except Rollback:
+            self.stdout.write('Seeded rows and dropped indexes have been rolled back.')
+
+    def seed(self):
+        options = self.options
+        batch_size = options['batch_size']
+        self.stdout.write('Seeding tables...')
+
+        users = User.objects.bulk_create(
+            [User(username=f'bench{i}', phone_number=f'09{i:09d}', password='!')
+             for i in range(options['users'])],
+            batch_size=batch_size)
+
+        menus = QRMenu.objects.bulk_create(
+            [QRMenu(user=user, title=f'menu {n}', qr_status=QRMenu.QR_READY)
+             for user in users for n in range(options['menus_per_user'])],
+            batch_size=batch_size)
+
+        items = (MenuItem(menu=menu, item=f'item {n}', description='benchmark', price=n,
+                          available=random.random() > 0.2)
+                 for menu in menus for n in range(options['items_per_menu']))
+        while True:
+            batch = [item for _, item in zip(range(batch_size), items)]
+            if not batch:
+                break
+            MenuItem.objects.bulk_create(batch)
+
+        now = timezone.now()
+        # Spread the codes over a day, so only a fraction of them are expired.
+        otps = (OTPcode(phone_number=f'09{random.randrange(options["users"]):09d}', code=1234,
+                        created_at=now - timedelta(seconds=random.randrange(24 * 60 * 60)))
+                for _ in range(options['otps']))
+        # auto_now_add would overwrite created_at on insert.
+        created_at = OTPcode._meta.get_field('created_at')
+        created_at.auto_now_add = False
+        try:
+            while True:
+                batch = [otp for _, otp in zip(range(batch_size), otps)]
+                if not batch:
+                    break
+                OTPcode.objects.bulk_create(batch)
+        finally:
+            created_at.auto_now_add = True
+
+        self.user_id = users[len(users) // 2].id
+        self.menu_id = menus[len(menus) // 2].id
+        self.phone_number = users[len(users) // 2].phone_number
+        self.cutoff = now - timedelta(minutes=2)
+        self.analyze()
+
+    def analyze(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                for model in (QRMenu, MenuItem, OTPcode):
+                    cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+    def queries(self):
+        return {
+            'menu items': MenuItem.objects.filter(menu_id=self.menu_id, available=True),
+            'menus of user': QRMenu.objects.filter(user_id=self.user_id)
+                                           .order_by('-created_at', '-id')[:50],
+            'latest otp': OTPcode.objects.filter(phone_number=self.phone_number)
+                                         .order_by('-created_at')[:1],
+            'expired otps': OTPcode.objects.filter(created_at__lt=self.cutoff)
+                                           .values_list('id', flat=True)[:1000],
+        }
+
+    def run_queries(self):
+        results = {}
+        for name, queryset in self.queries().items():
+            timings = []
+            for _ in range(self.options['repeat']):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = {'plan': queryset.explain(), 'ms': statistics.median(timings)}
+        return results
+
+    def drop_indexes(self):
+        # Plain DROP/CREATE INDEX rather than the schema editor, which SQLite refuses to
+        # use inside the surrounding transaction.
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            for model in (QRMenu, MenuItem, OTPcode):
+                for index in model._meta.indexes:
+                    cursor.execute(f'DROP INDEX {quote(index.name)}')
+            # Restore the baseline schema: the composite indexes replaced the plain
+            # foreign key indexes, which the "without" run must still have.
+            for model, field in ((QRMenu, 'user'), (MenuItem, 'menu')):
+                table = model._meta.db_table
+                column = model._meta.get_field(field).column
+                cursor.execute(f'CREATE INDEX {quote(f"bench_{table}_{column}")} '
+                               f'ON {quote(table)} ({quote(column)})')
+        self.analyze()
+
+    def report(self, before, after):
+        for name in after:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{name}'))
+            self.stdout.write(f'  baseline indexes: {before[name]["ms"]:.3f} ms (median)')
+            self.stdout.write(f'  lookup indexes:   {after[name]["ms"]:.3f} ms (median)')
+            self.stdout.write('  plan with baseline indexes:')
+            self.stdout.write('    ' + before[name]['plan'].replace('\n', '\n    '))
+            self.stdout.write('  plan with lookup indexes:')
+            self.stdout.write('    ' + after[name]['plan'].replace('\n', '\n    '))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from menu.reconcile import collect_orphaned_qr_images
+
+
+class Command(BaseCommand):
+    help = 'Deletes QR images in the bucket that no menu references.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report orphaned images, do not delete them.')
+        parser.add_argument('--chunk-size', type=int, default=None)
+        parser.add_argument('--grace-period', type=int, default=None,
+                            help='Skip images uploaded less than this many seconds ago.')
+
+    def handle(self, *args, **options):
+        stats = collect_orphaned_qr_images(dry_run=options['dry_run'],
+                                           chunk_size=options['chunk_size'],
+                                           grace_period=options['grace_period'])
+        for name, value in stats.items():
+            self.stdout.write(f'{name}: {value}')
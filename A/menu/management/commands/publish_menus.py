@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from menu.documents import publish_menu
+from menu.models import QRMenu
+from menu.publishers import get_publisher
+from menu import tasks
+
+
+class Command(BaseCommand):
+    help = 'Republishes the static snapshots of all menus (or of the given menu ids).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('menu_ids', nargs='*', type=int)
+        parser.add_argument('--async', action='store_true', dest='use_celery',
+                            help='Queue one publish task per menu instead of publishing inline.')
+
+    def handle(self, *args, **options):
+        menu_ids = options['menu_ids'] or QRMenu.objects.values_list('id', flat=True).iterator()
+
+        publisher = None if options['use_celery'] else get_publisher()
+
+        published = 0
+        for menu_id in menu_ids:
+            if options['use_celery']:
+                tasks.publish_menu_task.delay(menu_id)
+            else:
+                publish_menu(menu_id, publisher=publisher)
+            published += 1
+
+        self.stdout.write(self.style.SUCCESS(f'{published} menus published'))
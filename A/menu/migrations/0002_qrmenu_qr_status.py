@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:46
+
+from django.db import migrations, models
+
+
+def mark_rendered_menus_ready(apps, schema_editor):
+    QRMenu = apps.get_model('menu', 'QRMenu')
+    QRMenu.objects.exclude(qr_code='').update(qr_status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='qrmenu',
+            name='qr_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='qrmenu',
+            name='qr_code',
+            field=models.ImageField(blank=True, upload_to='qr_menu/'),
+        ),
+        migrations.RunPython(mark_rendered_menus_ready, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0002_qrmenu_qr_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='qrmenu',
+            name='qr_code',
+            field=models.ImageField(blank=True, db_index=True, upload_to='qr_menu/'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0003_qrmenu_qr_code_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Create the composite indexes before dropping the foreign key indexes they cover.
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['menu', 'available'], name='menuitem_menu_available_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(condition=models.Q(('available', True)), fields=['menu', 'id'], name='menuitem_available_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='qrmenu',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='qrmenu_user_created_idx'),
+        ),
+        migrations.AlterField(
+            model_name='menuitem',
+            name='menu',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='items', to='menu.qrmenu'),
+        ),
+        migrations.AlterField(
+            model_name='qrmenu',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='menus', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -1,9 +1,25 @@
-from django.db import models
+from django.db import models, transaction
 from accounts.models import User
-import qrcode
-from django.core.files import File
-from io import BytesIO
 from django.conf import settings
+from . import qr, publishers
+
+
+class QRMenuQuerySet(models.QuerySet):
+
+    def owned_by(self, user):
+        return self.filter(user=user)
+
+    def delete(self):
+        """
+        Deletes the menus and queues a single batched removal of their QR images,
+        instead of one storage round trip per row.
+        """
+        from . import tasks
+
+        qr_keys = list(self.exclude(qr_code='').values_list('qr_code', flat=True))
+        result = super().delete()
+        tasks.delete_objects_on_commit(qr_keys)
+        return result
 
 
 class QRMenu(models.Model):
@@ -15,37 +31,96 @@ class QRMenu(models.Model):
     The QR code links to the menu's unique URL. It also stores metadata about the menu, such as 
     its title, description, availability status, and creation date.
 
+    Saving a menu only persists the row: the QR image is rendered and uploaded by
+    `tasks.render_qr_code_task` once the transaction commits, and `qr_status` reports
+    whether the image is still pending, ready or failed. QR images are content-addressed
+    (see `menu.qr`), so edits that do not change the QR payload never re-render it.
+
     """
 
-    
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='menus')
+    QR_PENDING = 'pending'
+    QR_READY = 'ready'
+    QR_FAILED = 'failed'
+
+    QR_STATUS_CHOICES = [
+        (QR_PENDING, 'Pending'),
+        (QR_READY, 'Ready'),
+        (QR_FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='menus', db_index=False)
     title = models.CharField(max_length=225)
     description = models.CharField(max_length=350, blank=True, null=True)
-    qr_code = models.ImageField(upload_to='qr_menu/')
+    qr_code = models.ImageField(upload_to='qr_menu/', blank=True, db_index=True)
+    qr_status = models.CharField(max_length=10, choices=QR_STATUS_CHOICES, default=QR_PENDING)
     available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = QRMenuQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Serves `MenuViewSet.list` (menus of a user, newest first) and replaces the
+            # plain foreign key index on user_id, which it covers as a prefix.
+            models.Index(fields=['user', 'created_at', 'id'], name='qrmenu_user_created_idx'),
+        ]
+
+    @property
+    def qr_payload(self):
+        if settings.MENU_PUBLISH_ENABLED:
+            return publishers.snapshot_url(self.id)
+        return f"{settings.QR_CODE_BASE_URL}{self.id}"
+
+    def qr_asset_name(self):
+        return qr.qr_asset_name(self.qr_payload, **qr.qr_options())
+
     def save(self, *args, **kwargs):
-            
-        qr_data = f"https://TheWebSiteAddres/menu/{self.id}"
-        qr_image = qrcode.make(qr_data)
-        qr_io = BytesIO()
-        qr_image.save(qr_io, 'PNG')
-        self.qr_code.save(f'{self.title}.png', File(qr_io), save=False)
-        qr_io.close()
+        from . import tasks
 
+        needs_render = self._state.adding or self.qr_code.name != self.qr_asset_name()
+        if needs_render:
+            self.qr_status = self.QR_PENDING
         super().save(*args, **kwargs)
 
+        if needs_render:
+            menu_id = self.id
+            transaction.on_commit(lambda: tasks.render_qr_code_task.delay(menu_id))
+
+    def render_qr_code(self):
+        """
+        Points `qr_code` at the content-addressed QR image of this menu, rendering and
+        uploading it only if the bucket does not already hold an identical image.
+
+        Persisting the new `qr_code` name and status is left to the caller so the
+        render task can do it with a single UPDATE.
+        """
+        self.qr_code.name = qr.get_or_create_qr_asset(self.qr_payload, storage=self.qr_code.storage)
+
     def __str__(self):
         return f"{self.title} - {self.description} - {self.id}"
     
 
 
     def delete(self, *args, **kwargs):
+        from . import tasks
 
-        if self.qr_code and self.qr_code.storage.exists(self.qr_code.name):
-            self.qr_code.delete(save=False)
-        return super().delete(*args, **kwargs)
+        qr_key = self.qr_code.name
+        result = super().delete(*args, **kwargs)
+        tasks.delete_objects_on_commit([qr_key])
+        return result
+
+
+class MenuItemQuerySet(models.QuerySet):
+
+    def owned_by(self, user):
+        return self.filter(menu__user=user)
+
+    def with_owner(self):
+        """
+        Annotates each item with `owner_id`, the id of its menu's user, so ownership
+        checks need neither `item.menu` nor `menu.user` to be loaded separately.
+        """
+        return self.annotate(owner_id=models.F('menu__user_id'))
 
 
 class MenuItem(models.Model):
@@ -58,11 +133,23 @@ class MenuItem(models.Model):
 
     """
 
-    menu = models.ForeignKey(QRMenu, on_delete=models.CASCADE, related_name='items')
+    menu = models.ForeignKey(QRMenu, on_delete=models.CASCADE, related_name='items', db_index=False)
     item = models.CharField(max_length=225)
     description = models.CharField(max_length=225)
     price = models.IntegerField()
     available = models.BooleanField(default=True)
 
+    objects = MenuItemQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Items are always read per menu, usually filtered on availability; the
+            # composite index also replaces the foreign key index on menu_id.
+            models.Index(fields=['menu', 'available'], name='menuitem_menu_available_idx'),
+            # Public menus only list available items, in id order.
+            models.Index(fields=['menu', 'id'], condition=models.Q(available=True),
+                         name='menuitem_available_idx'),
+        ]
+
     def __str__(self):
         return f"{self.item} - {self.menu} - {self.id}"
@@ -0,0 +1,70 @@
+import os
+import tempfile
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+def snapshot_key(menu_id, extension):
+    return f"{settings.MENU_PUBLISH_PREFIX}{menu_id}.{extension}"
+
+
+def snapshot_url(menu_id):
+    """
+    Public URL of the snapshot a diner should land on when scanning the menu's QR code.
+    """
+    extension = 'html' if settings.MENU_PUBLISH_HTML else 'json'
+    return f"{settings.MENU_PUBLISH_BASE_URL}{snapshot_key(menu_id, extension)}"
+
+
+class BucketMenuPublisher:
+    """
+    Publishes menu snapshots as objects in the S3-compatible bucket behind `bucket.py`,
+    to be served by the CDN in front of it.
+    """
+
+    def __init__(self):
+        from bucket import bucket
+        self.bucket = bucket
+
+    def publish(self, key, body, content_type):
+        return self.bucket.put_object(key, body, content_type=content_type,
+                                      cache_control=settings.MENU_PUBLISH_CACHE_CONTROL)
+
+    def unpublish(self, keys):
+        return not self.bucket.delete_objects(keys)
+
+
+class FileSystemMenuPublisher:
+    """
+    Writes menu snapshots under `MENU_PUBLISH_LOCATION`, for tests and local
+    development without network access.
+    """
+
+    def __init__(self, location=None):
+        self.location = location or settings.MENU_PUBLISH_LOCATION
+
+    def path(self, key):
+        return os.path.join(self.location, *key.split('/'))
+
+    def publish(self, key, body, content_type):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first so readers never see a half-written snapshot.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as snapshot:
+            snapshot.write(body)
+        os.replace(tmp_path, path)
+        return True
+
+    def unpublish(self, keys):
+        for key in keys:
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+        return True
+
+
+def get_publisher():
+    return import_string(settings.MENU_PUBLISH_BACKEND)()
@@ -0,0 +1,70 @@
+import hashlib
+from io import BytesIO
+import qrcode
+from qrcode import constants
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+
+ERROR_CORRECTION_LEVELS = {
+    'L': constants.ERROR_CORRECT_L,
+    'M': constants.ERROR_CORRECT_M,
+    'Q': constants.ERROR_CORRECT_Q,
+    'H': constants.ERROR_CORRECT_H,
+}
+
+QR_UPLOAD_PREFIX = 'qr_menu/'
+
+
+def qr_options():
+    """
+    Returns the rendering options that, together with the payload, identify a QR image.
+    """
+    return {
+        'box_size': settings.QR_CODE_BOX_SIZE,
+        'border': settings.QR_CODE_BORDER,
+        'error_correction': settings.QR_CODE_ERROR_CORRECTION,
+        'image_format': settings.QR_CODE_FORMAT,
+    }
+
+
+def qr_asset_name(payload, box_size, border, error_correction, image_format):
+    """
+    Builds the content-addressed storage name of a QR image.
+
+    The name is a hash of everything that affects the rendered bytes, so two
+    renders with the same inputs always map to the same object in the bucket.
+    """
+    key = '\x1f'.join([payload, str(box_size), str(border), error_correction, image_format])
+    digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+    return f"{QR_UPLOAD_PREFIX}{digest}.{image_format.lower()}"
+
+
+def render_qr_image(payload, box_size, border, error_correction, image_format):
+    qr = qrcode.QRCode(
+        error_correction=ERROR_CORRECTION_LEVELS[error_correction],
+        box_size=box_size,
+        border=border,
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+
+    qr_io = BytesIO()
+    qr.make_image().save(qr_io, image_format)
+    return qr_io.getvalue()
+
+
+def get_or_create_qr_asset(payload, storage=None, **options):
+    """
+    Returns the storage name of the QR image for `payload`, rendering and uploading
+    it only when no object with the same content address exists yet.
+    """
+    storage = storage or default_storage
+    options = {**qr_options(), **options}
+    name = qr_asset_name(payload, **options)
+    if storage.exists(name):
+        return name
+
+    image = render_qr_image(payload, **options)
+    return storage.save(name, ContentFile(image))
@@ -0,0 +1,66 @@
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from bucket import bucket
+from .models import QRMenu
+from .qr import QR_UPLOAD_PREFIX
+
+
+logger = logging.getLogger(__name__)
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for element in iterable:
+        chunk.append(element)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def collect_orphaned_qr_images(dry_run=False, prefix=QR_UPLOAD_PREFIX, chunk_size=None,
+                               grace_period=None):
+    """
+    Deletes QR images in the bucket that no `QRMenu.qr_code` points at.
+
+    Bucket keys are streamed page by page and checked against the database one
+    chunk at a time with a single indexed `qr_code IN (...)` query, so memory stays
+    bounded by `chunk_size` however many keys the bucket holds. Objects younger than
+    `grace_period` seconds are skipped, since a render task may have uploaded them
+    but not yet saved the new name on its menu.
+
+    Returns counters describing the pass; with `dry_run` nothing is deleted.
+    """
+    chunk_size = chunk_size or settings.QR_GC_CHUNK_SIZE
+    grace_period = settings.QR_GC_GRACE_PERIOD if grace_period is None else grace_period
+    cutoff = timezone.now() - timedelta(seconds=grace_period)
+
+    stats = {'scanned': 0, 'recent': 0, 'referenced': 0, 'orphaned': 0,
+             'deleted': 0, 'failed': 0, 'dry_run': dry_run}
+    started = time.monotonic()
+
+    for chunk in _chunks(bucket.iter_objects(prefix=prefix), chunk_size):
+        stats['scanned'] += len(chunk)
+        keys = {obj['Key'] for obj in chunk if obj['LastModified'] < cutoff}
+        stats['recent'] += len(chunk) - len(keys)
+        if not keys:
+            continue
+
+        referenced = set(QRMenu.objects.filter(qr_code__in=keys)
+                         .values_list('qr_code', flat=True))
+        orphans = sorted(keys - referenced)
+        stats['referenced'] += len(referenced)
+        stats['orphaned'] += len(orphans)
+
+        if orphans and not dry_run:
+            failed = bucket.delete_objects(orphans)
+            stats['failed'] += len(failed)
+            stats['deleted'] += len(orphans) - len(failed)
+
+    stats['elapsed'] = round(time.monotonic() - started, 3)
+    logger.info('QR image reconciliation finished: %s', stats)
+    return stats
@@ -12,6 +12,31 @@ class QRMenuSerializer(serializers.ModelSerializer):
 
 
 
+class QRMenuListSerializer(serializers.ModelSerializer):
+    """
+    Serializer for `MenuViewSet.list` that only renders the fields passed as `fields`
+    (a sparse fieldset), defaulting to the fields of `QRMenuSerializer`. `item_count`
+    must be annotated on the queryset by the caller.
+    """
+
+    item_count = serializers.IntegerField(read_only=True)
+
+    default_fields = ['id', 'title', 'description']
+
+    class Meta:
+        model = QRMenu
+        fields = [
+            'id', 'title', 'description', 'available', 'qr_status', 'created_at', 'item_count'
+        ]
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = fields or self.default_fields
+        for name in set(self.fields) - set(selected):
+            self.fields.pop(name)
+
+
+
 class MenuItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = MenuItem
@@ -33,3 +58,55 @@ class BulckSerializerMenuItem(serializers.Serializer):
 
         menu_items = [MenuItem(menu=menu, **item) for item in items_data ]
         return MenuItem.objects.bulk_create(menu_items)
+
+
+
+class ItemChangeSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    item = serializers.CharField(max_length=225, required=False)
+    description = serializers.CharField(max_length=225, required=False)
+    price = serializers.IntegerField(required=False)
+    available = serializers.BooleanField(required=False)
+
+
+class BulkItemUpdateSerializer(serializers.Serializer):
+
+    items = ItemChangeSerializer(many=True, allow_empty=False)
+
+    def validate_items(self, items):
+        ids = [item['id'] for item in items]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError('each item id may only appear once')
+        return items
+
+
+
+class ItemUpsertSerializer(serializers.Serializer):
+    item = serializers.CharField(max_length=225)
+    description = serializers.CharField(max_length=225, required=False)
+    price = serializers.IntegerField()
+    available = serializers.BooleanField(required=False)
+
+
+class BulkItemUpsertSerializer(serializers.Serializer):
+
+    items = ItemUpsertSerializer(many=True, allow_empty=False)
+
+    def validate_items(self, items):
+        names = [item['item'] for item in items]
+        if len(names) != len(set(names)):
+            raise serializers.ValidationError('each item name may only appear once')
+        return items
+
+
+
+class ItemAvailabilitySerializer(serializers.Serializer):
+    available = serializers.BooleanField()
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    name = serializers.CharField(max_length=225, required=False)
+    menus = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+
+    def validate(self, data):
+        if not any(selector in data for selector in ('ids', 'name', 'menus')):
+            raise serializers.ValidationError('at least one of ids, name or menus is required')
+        return data
@@ -0,0 +1,87 @@
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from .models import MenuItem
+
+
+def _bulk_update_grouped(queryset, changes):
+    """
+    Applies `changes` (dicts with `id` plus the fields to change) through `queryset`
+    with one `bulk_update` per distinct set of changed fields, so a field that is
+    absent from a change is never overwritten. Returns the number of rows updated.
+
+    `bulk_update` filters on `queryset`, so rows outside it are left untouched.
+    """
+    groups = defaultdict(list)
+    for change in changes:
+        fields = tuple(sorted(field for field in change if field != 'id'))
+        if fields:
+            groups[fields].append(MenuItem(**change))
+
+    updated = 0
+    for fields, items in groups.items():
+        updated += queryset.bulk_update(items, fields,
+                                        batch_size=settings.MENU_BULK_BATCH_SIZE)
+    return updated
+
+
+def bulk_update_items(menu, changes):
+    """
+    Updates many items of `menu` at once. Each batch is a single
+    `UPDATE ... SET field = CASE id WHEN ... END WHERE menu_id = ... AND id IN (...)`,
+    and ids that do not belong to the menu are skipped by the WHERE clause.
+    """
+    with transaction.atomic():
+        return _bulk_update_grouped(MenuItem.objects.filter(menu=menu), changes)
+
+
+def upsert_items(menu, rows):
+    """
+    Creates or updates items of `menu` matched by item name, e.g. for a POS sync: one
+    SELECT resolves the existing names, then one `bulk_update` per set of changed
+    fields and one `bulk_create` handle the rest.
+    """
+    names = [row['item'] for row in rows]
+    with transaction.atomic():
+        existing = dict(MenuItem.objects.filter(menu=menu, item__in=names)
+                        .values_list('item', 'id'))
+
+        changes = [{'id': existing[row['item']], **row} for row in rows if row['item'] in existing]
+        updated = _bulk_update_grouped(MenuItem.objects.filter(menu=menu), changes)
+
+        created = MenuItem.objects.bulk_create(
+            [MenuItem(menu=menu, **{'description': '', **row})
+             for row in rows if row['item'] not in existing],
+            batch_size=settings.MENU_BULK_BATCH_SIZE)
+
+    return {'updated': updated, 'created': len(created)}
+
+
+def set_items_availability(user, available, ids=None, name=None, menu_ids=None):
+    """
+    Marks the items of `user` matching all given selectors (item ids, a case-insensitive
+    name fragment, menu ids) as available or not, e.g. to 86 every dish using an
+    ingredient the kitchen ran out of.
+
+    Rows already in the requested state are left alone. One indexed SELECT finds the
+    menus that will change, for cache invalidation, and a single UPDATE flips the flags.
+    Returns `(updated, menu_ids)`.
+    """
+    selected = Q(available=not available)
+    if ids is not None:
+        selected &= Q(id__in=ids)
+    if name:
+        selected &= Q(item__icontains=name)
+    if menu_ids is not None:
+        selected &= Q(menu_id__in=menu_ids)
+
+    with transaction.atomic():
+        changed_menus = list(MenuItem.objects.owned_by(user).filter(selected)
+                             .order_by().values_list('menu_id', flat=True).distinct())
+        if not changed_menus:
+            return 0, []
+        # The menus are known to belong to the user, so the UPDATE needs no join.
+        updated = (MenuItem.objects.filter(selected, menu_id__in=changed_menus)
+                   .update(available=available))
+    return updated, changed_menus
@@ -0,0 +1,16 @@
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+from accounts.models import User
+from .models import QRMenu
+from . import tasks
+
+
+@receiver(pre_delete, sender=User)
+def delete_user_qr_images(sender, instance, **kwargs):
+    """
+    Deleting a user cascades to their menus in SQL without calling `QRMenu.delete()`,
+    so their QR keys are collected here in one query and removed in one batch.
+    """
+    qr_keys = QRMenu.objects.filter(user=instance).exclude(qr_code='') \
+        .values_list('qr_code', flat=True)
+    tasks.delete_objects_on_commit(list(qr_keys))
@@ -1,10 +1,13 @@
+import threading
 from bucket import bucket
 from celery import shared_task
+from django.db import DEFAULT_DB_ALIAS, transaction
+from .models import QRMenu
 
-# TODO : need to get async
 
-def get_all_objects_task():
-    return bucket.get_all_objects()
+@shared_task
+def count_objects_task(prefix=''):
+    return sum(1 for _ in bucket.iter_objects(prefix=prefix))
 
 
 @shared_task
@@ -13,4 +16,105 @@ def get_one_object_tasks(key):
 
 @shared_task
 def delete_object_tasks(key):
-    return bucket.delete_object(key)
\ No newline at end of file
+    return bucket.delete_object(key)
+
+
+@shared_task(bind=True, max_retries=5, default_retry_delay=30)
+def delete_objects_task(self, keys):
+    """
+    Deletes any number of bucket keys with batched multi-object deletes; keys the
+    bucket fails to delete are retried in a follow-up task.
+    """
+    failed = bucket.delete_objects(keys)
+    if failed:
+        raise self.retry(args=[failed])
+    return len(keys)
+
+
+_pending_deletes = threading.local()
+
+
+def delete_objects_on_commit(keys, using=DEFAULT_DB_ALIAS):
+    """
+    Queues `keys` for deletion once the current transaction commits, so images are
+    never removed for rows whose deletion is rolled back. Keys queued during the same
+    transaction, e.g. by deleting menus one by one in a loop, are collected into a
+    single `delete_objects_task`.
+    """
+    keys = {key for key in keys if key}
+    if not keys:
+        return
+
+    connection = transaction.get_connection(using)
+    pending = getattr(_pending_deletes, using, None)
+    # The callback is only extended while it is still waiting in this transaction at
+    # the same savepoint level: once run, or dropped by a rollback, it is gone from
+    # `run_on_commit`, and keys queued inside a savepoint must roll back with it.
+    savepoints = set(connection.savepoint_ids)
+    if pending is not None and any(entry[1] is pending[1] and entry[0] == savepoints
+                                   for entry in connection.run_on_commit):
+        pending[0].update(keys)
+        return
+
+    collected = set(keys)
+
+    def flush():
+        delete_objects_task.delay(sorted(collected))
+
+    setattr(_pending_deletes, using, (collected, flush))
+    transaction.on_commit(flush, using=using)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=10)
+def render_qr_code_task(self, menu_id):
+    """
+    Renders and uploads the QR image of a menu outside the request thread.
+
+    The new image name and the `ready` status are written with a single UPDATE so
+    `QRMenu.save()` is not re-entered, and the image it replaces is removed from
+    storage afterwards. Menus whose image is already up to date are skipped.
+    """
+    try:
+        menu = QRMenu.objects.get(id=menu_id)
+    except QRMenu.DoesNotExist:
+        return False
+
+    previous_image = menu.qr_code.name
+    if menu.qr_status == QRMenu.QR_READY and previous_image == menu.qr_asset_name():
+        return True
+
+    try:
+        menu.render_qr_code()
+    except Exception as exc:
+        if self.request.retries >= self.max_retries:
+            QRMenu.objects.filter(id=menu_id).update(qr_status=QRMenu.QR_FAILED)
+            raise
+        raise self.retry(exc=exc)
+
+    QRMenu.objects.filter(id=menu_id).update(qr_code=menu.qr_code.name,
+                                             qr_status=QRMenu.QR_READY)
+
+    if previous_image and previous_image != menu.qr_code.name:
+        menu.qr_code.storage.delete(previous_image)
+    return True
+
+
+@shared_task(bind=True, max_retries=5, default_retry_delay=30)
+def publish_menu_task(self, menu_id):
+    """
+    Republishes the static snapshot of a single changed menu.
+    """
+    from .documents import publish_menu
+
+    try:
+        publish_menu(menu_id)
+    except Exception as exc:
+        raise self.retry(exc=exc)
+    return True
+
+
+@shared_task
+def collect_orphaned_qr_images_task(dry_run=False):
+    from .reconcile import collect_orphaned_qr_images
+
+    return collect_orphaned_qr_images(dry_run=dry_run)
@@ -0,0 +1,90 @@
+from django.conf import settings
+from django.http import Http404
+from django.test import TestCase
+from django.core.cache import caches
+from unittest.mock import patch
+from menu.cache import MenuCache
+from menu.documents import MenuDocument, get_menu_document, refresh_menu_document
+
+
+class TestMenuCache(TestCase):
+
+    def setUp(self):
+        caches['menu'].clear()
+        self.cache = MenuCache()
+        self.builds = []
+
+    def builder(self, menu_id):
+        self.builds.append(menu_id)
+        return {'menu': {'id': menu_id}, 'items': []}
+
+    def test_read_through(self):
+        first = self.cache.get_or_build(1, self.builder)
+        second = self.cache.get_or_build(1, self.builder)
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.builds, [1])
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_invalidate_bumps_version(self):
+        self.cache.get_or_build(1, self.builder)
+        version = self.cache.get_version(1)
+
+        self.cache.invalidate(1)
+        self.assertNotEqual(self.cache.get_version(1), version)
+
+        self.cache.get_or_build(1, self.builder)
+        self.assertEqual(self.builds, [1, 1])
+
+    def test_invalidate_only_touches_one_menu(self):
+        self.cache.get_or_build(1, self.builder)
+        self.cache.get_or_build(2, self.builder)
+
+        self.cache.invalidate(1)
+        self.cache.get_or_build(2, self.builder)
+        self.assertEqual(self.builds, [1, 2])
+
+    def test_set_stores_under_current_version(self):
+        version = self.cache.invalidate(1)
+        self.assertEqual(self.cache.get_version(1), version)
+        self.cache.set(1, {'menu': {'id': 1}, 'items': []}, version)
+
+        self.cache.get_or_build(1, self.builder)
+        self.assertEqual(self.builds, [])
+
+    def test_unknown_menu_stores_nothing(self):
+        def builder(menu_id):
+            raise Http404
+
+        with self.assertRaises(Http404):
+            self.cache.get_or_build(404, builder)
+        self.assertIsNone(self.cache.backend.get(self.cache.version_key(404)))
+
+    def test_version_keys_expire(self):
+        with patch.object(self.cache.backend, 'add', wraps=self.cache.backend.add) as add:
+            self.cache.get_or_build(1, self.builder)
+        self.assertEqual(add.call_args.kwargs['timeout'], settings.MENU_CACHE_TIMEOUT)
+
+        self.cache.backend.delete(self.cache.version_key(2))
+        with patch.object(self.cache.backend, 'set', wraps=self.cache.backend.set) as set_:
+            self.cache.invalidate(2)
+        self.assertEqual(set_.call_args.kwargs['timeout'], settings.MENU_CACHE_TIMEOUT)
+
+    def test_interleaved_refreshes_keep_newest_document(self):
+        stale = MenuDocument(body=b'stale', etag='"stale"')
+        fresh = MenuDocument(body=b'fresh', etag='"fresh"')
+        builds = []
+
+        def build(menu_id):
+            # The first refresh is still building when a second one runs to completion.
+            builds.append(menu_id)
+            if len(builds) == 1:
+                refresh_menu_document(menu_id)
+                return stale
+            return fresh
+
+        with patch('menu.documents.build_menu_document', side_effect=build):
+            refresh_menu_document(1)
+
+        self.assertEqual(get_menu_document(1), fresh)
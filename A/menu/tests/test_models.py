@@ -1,7 +1,10 @@
+from django.db import DatabaseError, transaction
 from django.test import TestCase
 from accounts.models import User
 from menu.models import QRMenu
+from menu import tasks
 from django.core.files.storage import default_storage
+from unittest.mock import patch
 
 class TestQRMneu(TestCase):
 
@@ -9,7 +12,7 @@ class TestQRMneu(TestCase):
         self.user = User.objects.create_user(username='testuser',
                                              phone_number='011111111',
                                              password='1234')
-        
+
     def test_create_qrmenu(self):
         menu =QRMenu.objects.create(title='the menu',
                                     description = 'a menu for test',
@@ -17,14 +20,122 @@ class TestQRMneu(TestCase):
         self.assertEqual(menu.title, 'the menu')
         self.assertEqual(menu.description, 'a menu for test')
         self.assertTrue(menu.available)
-        self.assertIsNotNone(menu.qr_code)
+        self.assertEqual(menu.qr_status, QRMenu.QR_PENDING)
+        self.assertFalse(menu.qr_code)
+
+        tasks.render_qr_code_task(menu.id)
+        menu.refresh_from_db()
+        self.assertEqual(menu.qr_status, QRMenu.QR_READY)
         self.assertTrue(default_storage.exists(menu.qr_code.name))
 
-    
+
+    def test_save_enqueues_qr_render(self):
+        with patch('menu.tasks.render_qr_code_task.delay') as render:
+            with self.captureOnCommitCallbacks(execute=True):
+                menu =QRMenu.objects.create(title='the menu',
+                                            description = 'a menu for test',
+                                            user=self.user)
+        render.assert_called_once_with(menu.id)
+
+
+    def test_edit_does_not_rerender_qr(self):
+        menu =QRMenu.objects.create(title='the menu',
+                                    description = 'a menu for test',
+                                    user=self.user)
+        tasks.render_qr_code_task(menu.id)
+        menu.refresh_from_db()
+        name = menu.qr_code.name
+
+        with patch('menu.tasks.render_qr_code_task.delay') as render:
+            with self.captureOnCommitCallbacks(execute=True):
+                menu.title = 'renamed menu'
+                menu.save()
+        render.assert_not_called()
+        menu.refresh_from_db()
+        self.assertEqual(menu.qr_code.name, name)
+        self.assertEqual(menu.qr_status, QRMenu.QR_READY)
+
+
+    def test_qr_asset_is_content_addressed(self):
+        menu =QRMenu.objects.create(title='the menu',
+                                    description = 'a menu for test',
+                                    user=self.user)
+        tasks.render_qr_code_task(menu.id)
+        menu.refresh_from_db()
+        self.assertEqual(menu.qr_code.name, menu.qr_asset_name())
+
+        QRMenu.objects.filter(id=menu.id).update(qr_status=QRMenu.QR_PENDING)
+        with patch('menu.qr.render_qr_image') as render:
+            tasks.render_qr_code_task(menu.id)
+        render.assert_not_called()
+
+
     def test_delete_qrmenu(self):
         menu =QRMenu.objects.create(title='the menu',
                                     description = 'a menu for test',
                                     user=self.user)
+        tasks.render_qr_code_task(menu.id)
+        menu.refresh_from_db()
         name = menu.qr_code.name
-        menu.delete()
-        self.assertFalse(default_storage.exists(name))
\ No newline at end of file
+
+        with patch('menu.tasks.delete_objects_task.delay') as delete_objects:
+            with self.captureOnCommitCallbacks(execute=True):
+                menu.delete()
+        delete_objects.assert_called_once_with([name])
+        self.assertFalse(QRMenu.objects.filter(id=menu.id).exists())
+
+
+    def test_delete_queryset_batches_qr_images(self):
+        menus = [QRMenu.objects.create(title=f'menu {i}', user=self.user) for i in range(3)]
+        for menu in menus:
+            QRMenu.objects.filter(id=menu.id).update(qr_code=f'qr_menu/{menu.id}.png')
+
+        with patch('menu.tasks.delete_objects_task.delay') as delete_objects:
+            with self.captureOnCommitCallbacks(execute=True):
+                QRMenu.objects.filter(user=self.user).delete()
+        delete_objects.assert_called_once_with(sorted(f'qr_menu/{menu.id}.png' for menu in menus))
+
+
+    def test_delete_user_batches_qr_images(self):
+        menus = [QRMenu.objects.create(title=f'menu {i}', user=self.user) for i in range(2)]
+        for menu in menus:
+            QRMenu.objects.filter(id=menu.id).update(qr_code=f'qr_menu/{menu.id}.png')
+
+        with patch('menu.tasks.delete_objects_task.delay') as delete_objects:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.delete()
+        delete_objects.assert_called_once_with(sorted(f'qr_menu/{menu.id}.png' for menu in menus))
+        self.assertFalse(QRMenu.objects.exists())
+
+
+
+    def test_deletes_in_one_transaction_share_a_task(self):
+        menus = [QRMenu.objects.create(title=f'menu {i}', user=self.user) for i in range(3)]
+        for menu in menus:
+            QRMenu.objects.filter(id=menu.id).update(qr_code=f'qr_menu/{menu.id}.png')
+
+        with patch('menu.tasks.delete_objects_task.delay') as delete_objects:
+            with self.captureOnCommitCallbacks(execute=True):
+                for menu in QRMenu.objects.filter(user=self.user):
+                    menu.delete()
+        delete_objects.assert_called_once_with(sorted(f'qr_menu/{menu.id}.png' for menu in menus))
+
+
+    def test_rolled_back_deletes_keep_their_images(self):
+        menus = [QRMenu.objects.create(title=f'menu {i}', user=self.user) for i in range(2)]
+        for menu in menus:
+            QRMenu.objects.filter(id=menu.id).update(qr_code=f'qr_menu/{menu.id}.png')
+        kept, deleted = QRMenu.objects.filter(user=self.user).order_by('id')
+        kept_id = kept.id
+
+        with patch('menu.tasks.delete_objects_task.delay') as delete_objects:
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        kept.delete()
+                        raise DatabaseError
+                except DatabaseError:
+                    pass
+                deleted.delete()
+        delete_objects.assert_called_once_with([deleted.qr_code.name])
+        self.assertTrue(QRMenu.objects.filter(id=kept_id).exists())
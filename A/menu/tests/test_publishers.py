@@ -0,0 +1,111 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+from django.core.cache import caches
+from django.core.management import call_command
+from django.urls import reverse
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from accounts.models import User
+from menu.models import QRMenu, MenuItem
+from menu.documents import get_menu_document, publish_menu, menu_changed
+from menu.publishers import FileSystemMenuPublisher, snapshot_url
+
+
+class TestMenuPublisher(TestCase):
+
+    def setUp(self):
+        caches['menu'].clear()
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        self.publisher = FileSystemMenuPublisher(location=self.location)
+
+        self.user = User.objects.create_user(username='testuser',
+                                             phone_number='011111111',
+                                             password='1234')
+        self.menu = QRMenu.objects.create(title='the menu',
+                                          description='a menu for test',
+                                          user=self.user)
+        MenuItem.objects.create(menu=self.menu, item='Pizza',
+                                description='Cheese pizza', price=1500)
+
+    def snapshot_path(self, extension):
+        return os.path.join(self.location, 'menus', f'{self.menu.id}.{extension}')
+
+    def test_publish_menu(self):
+        publish_menu(self.menu.id, publisher=self.publisher)
+
+        with open(self.snapshot_path('json')) as snapshot:
+            document = json.load(snapshot)
+        self.assertEqual(document['menu']['title'], 'the menu')
+        self.assertEqual(len(document['items']), 1)
+
+        with open(self.snapshot_path('html')) as snapshot:
+            self.assertIn('Pizza', snapshot.read())
+
+    def test_publish_ignores_stale_cache(self):
+        get_menu_document(self.menu.id)  # cached by this process
+        MenuItem.objects.filter(menu=self.menu).update(item='Calzone')
+
+        publish_menu(self.menu.id, publisher=self.publisher)
+        with open(self.snapshot_path('json')) as snapshot:
+            self.assertEqual(json.load(snapshot)['items'][0]['item'], 'Calzone')
+
+    def test_unpublish_deleted_menu(self):
+        publish_menu(self.menu.id, publisher=self.publisher)
+        menu_id = self.menu.id
+        self.menu.delete()
+        self.menu.id = menu_id
+
+        publish_menu(menu_id, publisher=self.publisher)
+        self.assertFalse(os.path.exists(self.snapshot_path('json')))
+        self.assertFalse(os.path.exists(self.snapshot_path('html')))
+
+    @override_settings(MENU_PUBLISH_ENABLED=True)
+    def test_create_publishes_menu(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        with patch('menu.tasks.publish_menu_task.delay') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = client.post(reverse('home:create_menu'),
+                                       data={'title': 'new menu', 'description': ''},
+                                       format='json')
+        publish.assert_called_once_with(response.data['id'])
+
+    @override_settings(MENU_PUBLISH_ENABLED=True)
+    def test_destroy_unpublishes_menu(self):
+        publish_menu(self.menu.id, publisher=self.publisher)
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        with patch('menu.tasks.publish_menu_task.delay',
+                   side_effect=lambda menu_id: publish_menu(menu_id, publisher=self.publisher)):
+            with self.captureOnCommitCallbacks(execute=True):
+                client.delete(reverse('home:menu-detail', args=[self.menu.id]))
+
+        self.assertFalse(os.path.exists(self.snapshot_path('json')))
+        self.assertFalse(os.path.exists(self.snapshot_path('html')))
+
+    def test_publish_menus_command(self):
+        out = StringIO()
+        with override_settings(MENU_PUBLISH_BACKEND='menu.publishers.FileSystemMenuPublisher',
+                               MENU_PUBLISH_LOCATION=self.location):
+            call_command('publish_menus', stdout=out)
+
+        self.assertIn('1 menus published', out.getvalue())
+        self.assertTrue(os.path.exists(self.snapshot_path('json')))
+
+    @override_settings(MENU_PUBLISH_ENABLED=True, MENU_PUBLISH_BASE_URL='https://cdn.example.com/')
+    def test_menu_change_queues_publish(self):
+        with patch('menu.tasks.publish_menu_task.delay') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                menu_changed(self.menu.id)
+        publish.assert_called_once_with(self.menu.id)
+
+        self.assertEqual(snapshot_url(self.menu.id),
+                         f'https://cdn.example.com/menus/{self.menu.id}.html')
+        self.assertEqual(self.menu.qr_payload, snapshot_url(self.menu.id))
@@ -0,0 +1,125 @@
+from accounts.models import User
+from accounts.flows import sign_flow
+from menu.models import QRMenu, MenuItem
+from rest_framework.test import APIClient, APITestCase
+from django.urls import reverse
+from rest_framework import status
+
+
+class TestItemMutationQueries(APITestCase):
+    """
+    Query-count regressions for the item mutation endpoints: the ownership check
+    must be part of the lookup query rather than lazy `item.menu.user` loads.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser',
+                                             phone_number='011111111',
+                                             password='1234')
+        self.other_user = User.objects.create_user(username='otheruser',
+                                                   phone_number='0222222222',
+                                                   password='1234')
+        self.menu = QRMenu.objects.create(title='the menu',
+                                          description=' a menu for test',
+                                          user=self.user)
+        self.item = MenuItem.objects.create(menu=self.menu, item='Pizza',
+                                            description='Cheese pizza', price=1500)
+        self.client.force_authenticate(user=self.user)
+
+    def test_remove_item_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.delete(reverse('home:remove_item', args=[self.item.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'message': 'Item has been deleted'})
+        self.assertFalse(MenuItem.objects.filter(id=self.item.id).exists())
+
+    def test_remove_item_forbidden_queries(self):
+        self.client.force_authenticate(user=self.other_user)
+        with self.assertNumQueries(1):
+            response = self.client.delete(reverse('home:remove_item', args=[self.item.id]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(MenuItem.objects.filter(id=self.item.id).exists())
+
+    def test_update_item_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.patch(reverse('home:update_item', args=[self.item.id]),
+                                         data={'price': 1200}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['price'], 1200)
+        self.assertEqual(MenuItem.objects.get(id=self.item.id).price, 1200)
+
+    def test_update_item_forbidden_queries(self):
+        self.client.force_authenticate(user=self.other_user)
+        with self.assertNumQueries(1):
+            response = self.client.patch(reverse('home:update_item', args=[self.item.id]),
+                                         data={'price': 1200}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(MenuItem.objects.get(id=self.item.id).price, 1500)
+
+    def test_add_item_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse('home:add_item', args=[self.menu.id]),
+                                        data={'item': 'Salad', 'description': 'Green salad',
+                                              'price': 800},
+                                        format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['item'], 'Salad')
+        self.assertTrue(MenuItem.objects.filter(menu=self.menu, item='Salad').exists())
+
+    def test_add_menu_items_queries(self):
+        self.client.credentials(HTTP_X_FLOW_TOKEN=sign_flow('menu', {'menu_id': self.menu.id}))
+
+        data = {'items': [{'item': f'Item {i}', 'description': 'Test', 'price': 100}
+                          for i in range(20)]}
+        # Menu ownership lookup and a single bulk INSERT; the flow token needs no session row.
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse('home:add_menu_item'), data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {'message': 'items saved'})
+        self.assertEqual(MenuItem.objects.filter(menu=self.menu).count(), 21)
+
+    def test_partial_update_menu_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.patch(reverse('home:menu-detail', args=[self.menu.id]),
+                                         data={'description': 'updated'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['description'], 'updated')
+
+    def test_bulk_update_items_queries(self):
+        items = MenuItem.objects.bulk_create(
+            [MenuItem(menu=self.menu, item=f'Item {i}', description='Test', price=i)
+             for i in range(50)])
+        data = {'items': [{'id': item.id, 'price': item.price + 100} for item in items]}
+        # Menu ownership lookup and a single UPDATE, wrapped in a savepoint.
+        with self.assertNumQueries(4):
+            response = self.client.patch(reverse('home:bulk_update_items', args=[self.menu.id]),
+                                         data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'updated': 50})
+        self.assertEqual(MenuItem.objects.get(id=items[7].id).price, 107)
+
+    def test_upsert_items_queries(self):
+        data = {'items': [{'item': 'Pizza', 'price': 1700}] +
+                         [{'item': f'Item {i}', 'price': i} for i in range(50)]}
+        # Menu ownership lookup, existing names lookup, one UPDATE and one INSERT,
+        # wrapped in a savepoint.
+        with self.assertNumQueries(6):
+            response = self.client.put(reverse('home:upsert_items', args=[self.menu.id]),
+                                       data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'updated': 1, 'created': 50})
+        self.assertEqual(MenuItem.objects.get(id=self.item.id).price, 1700)
+
+    def test_item_availability_queries(self):
+        MenuItem.objects.bulk_create(
+            [MenuItem(menu=self.menu, item=f'Mushroom {i}', description='Test', price=i)
+             for i in range(50)])
+        # Changed menus lookup and a single UPDATE, wrapped in a savepoint.
+        with self.assertNumQueries(4):
+            response = self.client.patch(reverse('home:item_availability'),
+                                         data={'available': False, 'name': 'mushroom'},
+                                         format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'updated': 50, 'menus': [self.menu.id]})
+        self.assertTrue(MenuItem.objects.get(id=self.item.id).available)
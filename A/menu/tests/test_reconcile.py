@@ -0,0 +1,58 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from accounts.models import User
+from menu.models import QRMenu
+from menu.reconcile import collect_orphaned_qr_images
+
+
+class TestCollectOrphanedQRImages(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user(username='testuser',
+                                        phone_number='011111111',
+                                        password='1234')
+        self.menu = QRMenu.objects.create(title='the menu', user=user)
+        QRMenu.objects.filter(id=self.menu.id).update(qr_code='qr_menu/live.png')
+
+        old = timezone.now() - timedelta(days=2)
+        self.objects = [
+            {'Key': 'qr_menu/live.png', 'LastModified': old},
+            {'Key': 'qr_menu/orphan-1.png', 'LastModified': old},
+            {'Key': 'qr_menu/orphan-2.png', 'LastModified': old},
+            {'Key': 'qr_menu/rendering.png', 'LastModified': timezone.now()},
+        ]
+        patcher = patch('menu.reconcile.bucket')
+        self.bucket = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.bucket.iter_objects.side_effect = lambda prefix: iter(self.objects)
+        self.bucket.delete_objects.return_value = []
+
+    def test_deletes_orphans_in_chunks(self):
+        stats = collect_orphaned_qr_images(chunk_size=2)
+
+        deleted = [key for call in self.bucket.delete_objects.call_args_list for key in call.args[0]]
+        self.assertEqual(deleted, ['qr_menu/orphan-1.png', 'qr_menu/orphan-2.png'])
+        self.assertEqual(self.bucket.delete_objects.call_count, 2)
+        self.assertEqual(stats['scanned'], 4)
+        self.assertEqual(stats['recent'], 1)
+        self.assertEqual(stats['referenced'], 1)
+        self.assertEqual(stats['orphaned'], 2)
+        self.assertEqual(stats['deleted'], 2)
+
+    def test_dry_run(self):
+        stats = collect_orphaned_qr_images(dry_run=True)
+
+        self.bucket.delete_objects.assert_not_called()
+        self.assertEqual(stats['orphaned'], 2)
+        self.assertEqual(stats['deleted'], 0)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('collect_orphaned_qr_images', '--dry-run', stdout=out)
+
+        self.assertIn('orphaned: 2', out.getvalue())
+        self.bucket.delete_objects.assert_not_called()
@@ -0,0 +1,75 @@
+from django.test import TestCase
+from unittest.mock import patch, MagicMock
+from bucket import Bucket
+from menu import tasks
+
+
+class TestDeleteObjects(TestCase):
+
+    def setUp(self):
+        self.bucket = Bucket()
+        self.bucket._connection = MagicMock()
+        self.bucket._connection.delete_objects.return_value = {}
+
+    def test_delete_objects_batches_keys(self):
+        keys = [f'qr_menu/{i}.png' for i in range(2500)]
+        failed = self.bucket.delete_objects(keys)
+
+        self.assertEqual(failed, [])
+        calls = self.bucket._connection.delete_objects.call_args_list
+        self.assertEqual(sorted(len(call.kwargs['Delete']['Objects']) for call in calls),
+                         [500, 1000, 1000])
+
+    def test_delete_objects_reports_failed_keys(self):
+        self.bucket._connection.delete_objects.return_value = {
+            'Errors': [{'Key': 'qr_menu/1.png', 'Code': 'InternalError'}]
+        }
+        self.assertEqual(self.bucket.delete_objects(['qr_menu/1.png', 'qr_menu/2.png']),
+                         ['qr_menu/1.png'])
+
+    def test_delete_objects_single_batch_without_pool(self):
+        with patch('bucket.ThreadPoolExecutor') as executor:
+            self.assertEqual(self.bucket.delete_objects(['qr_menu/1.png']), [])
+        executor.assert_not_called()
+        self.bucket._connection.delete_objects.assert_called_once()
+
+    def test_delete_objects_task(self):
+        with patch('menu.tasks.bucket.delete_objects', return_value=[]) as delete_objects:
+            self.assertEqual(tasks.delete_objects_task(['qr_menu/1.png', 'qr_menu/2.png']), 2)
+        delete_objects.assert_called_once_with(['qr_menu/1.png', 'qr_menu/2.png'])
+
+    def test_delete_objects_on_commit_skips_empty_keys(self):
+        with patch('menu.tasks.delete_objects_task.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                tasks.delete_objects_on_commit(['', None])
+        delay.assert_not_called()
+
+
+class TestIterObjects(TestCase):
+
+    def setUp(self):
+        self.bucket = Bucket()
+        self.bucket._connection = MagicMock()
+        self.paginator = self.bucket._connection.get_paginator.return_value
+
+    def test_iter_objects_walks_all_pages(self):
+        self.paginator.paginate.return_value = iter([
+            {'Contents': [{'Key': 'qr_menu/1.png'}, {'Key': 'qr_menu/2.png'}]},
+            {'Contents': [{'Key': 'qr_menu/3.png'}]},
+            {'KeyCount': 0},
+        ])
+        keys = [obj['Key'] for obj in self.bucket.iter_objects(prefix='qr_menu/')]
+
+        self.assertEqual(keys, ['qr_menu/1.png', 'qr_menu/2.png', 'qr_menu/3.png'])
+        self.bucket._connection.get_paginator.assert_called_once_with('list_objects_v2')
+        self.assertEqual(self.paginator.paginate.call_args.kwargs['Prefix'], 'qr_menu/')
+
+    def test_iter_objects_is_lazy(self):
+        self.paginator.paginate.return_value = iter([{'Contents': [{'Key': 'a'}]}])
+        objects = self.bucket.iter_objects()
+        self.paginator.paginate.assert_not_called()
+        self.assertEqual(next(objects)['Key'], 'a')
+
+    def test_count_objects_task(self):
+        with patch('menu.tasks.bucket.iter_objects', return_value=iter([{'Key': 'a'}, {'Key': 'b'}])):
+            self.assertEqual(tasks.count_objects_task('qr_menu/'), 2)
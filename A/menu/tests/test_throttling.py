@@ -0,0 +1,103 @@
+from unittest.mock import patch
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import User
+from menu.models import QRMenu
+from throttling import GCRARateThrottle, LocMemThrottleBackend
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLocMemThrottleBackend(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.backend = LocMemThrottleBackend(clock=self.clock)
+
+    def test_allows_burst_then_spaces_requests(self):
+        # 1 request per second, 3 at once.
+        self.assertEqual([self.backend.hit('key', 1, 3) for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(self.backend.hit('key', 1, 3), 1)
+
+        self.clock.now += 0.5
+        self.assertAlmostEqual(self.backend.hit('key', 1, 3), 0.5)
+        self.clock.now += 0.5
+        self.assertEqual(self.backend.hit('key', 1, 3), 0)
+        self.assertGreater(self.backend.hit('key', 1, 3), 0)
+
+    def test_denied_requests_are_not_counted(self):
+        for _ in range(10):
+            self.backend.hit('key', 1, 1)
+        self.clock.now += 1
+        self.assertEqual(self.backend.hit('key', 1, 1), 0)
+
+    def test_keys_are_independent(self):
+        self.backend.hit('a', 60, 1)
+        self.assertGreater(self.backend.hit('a', 60, 1), 0)
+        self.assertEqual(self.backend.hit('b', 60, 1), 0)
+
+    def test_prunes_idle_keys(self):
+        backend = LocMemThrottleBackend(clock=self.clock, max_keys=2)
+        backend.hit('a', 1, 1)
+        backend.hit('b', 1, 1)
+        self.clock.now += 5
+        backend.hit('c', 1, 1)
+        self.assertEqual(list(backend._arrivals), ['c'])
+
+
+class TestGCRARateThrottle(SimpleTestCase):
+
+    def test_parse_rate(self):
+        class Throttle(GCRARateThrottle):
+            scope = 'scan'
+        throttle = Throttle()
+
+        with self.settings(THROTTLE_BURSTS={}):
+            self.assertEqual(throttle.parse_rate('120/min'), (0.5, 120))
+        with self.settings(THROTTLE_BURSTS={'scan': 10}):
+            self.assertEqual(throttle.parse_rate('2/s'), (0.5, 10))
+        self.assertEqual(throttle.parse_rate(None), (None, None))
+
+
+@override_settings(THROTTLE_BURSTS={'scan': 3})
+class TestScanThrottle(APITestCase):
+
+    def setUp(self):
+        caches['menu'].clear()
+        self.backend = LocMemThrottleBackend(clock=FakeClock())
+        patcher = patch('throttling.get_throttle_backend', return_value=self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        user = User.objects.create_user(username='testuser', phone_number='011111111',
+                                        password='1234')
+        self.menu = QRMenu.objects.create(title='the menu', description='', user=user)
+        self.other_menu = QRMenu.objects.create(title='other menu', description='', user=user)
+
+    def fetch(self, menu, ip='10.0.0.1'):
+        return self.client.get(reverse('home:fetch_menu', args=[menu.id]), REMOTE_ADDR=ip)
+
+    def test_keyed_by_menu_not_by_diner(self):
+        for ip in ('10.0.0.1', '10.0.0.2', '10.0.0.3'):
+            self.assertEqual(self.fetch(self.menu, ip).status_code, status.HTTP_200_OK)
+
+        response = self.fetch(self.menu, '10.0.0.4')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(self.fetch(self.other_menu).status_code, status.HTTP_200_OK)
+
+    def test_anonymous_daily_limit_does_not_apply(self):
+        with self.settings(THROTTLE_BURSTS={'scan': 200}):
+            for _ in range(150):
+                response = self.fetch(self.menu)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -1,9 +1,15 @@
+import json
+from unittest.mock import patch
 from accounts.models import User
+from accounts.flows import sign_flow
+from django.core import signing
 from menu.models import QRMenu, MenuItem
-from rest_framework.test import APIClient,APITestCase
+from rest_framework.test import APIClient,APITestCase, APITransactionTestCase
 from django.urls import reverse
+from django.core.cache import caches
 from rest_framework import status
 from menu.serializers import QRMenuSerializer
+from menu.cache import menu_cache
 
 
 
@@ -35,6 +41,7 @@ class TestCreateMenu(APITestCase):
 
         menu = QRMenu.objects.filter(id=response.data['id'], user=self.user).exists()
         self.assertTrue(menu)
+        self.assertEqual(signing.loads(response.data['flow_token'], salt='accounts.flows.menu'), {'menu_id': response.data['id']})
 
 
     def test_invalid_creation(self):
@@ -68,9 +75,7 @@ class TestAddMenuItem(APITestCase):
                                           user=self.user)
         
         self.client.force_authenticate(user=self.user)
-        session = self.client.session
-        session['menu_id'] = self.menu.id
-        session.save()
+        self.client.credentials(HTTP_X_FLOW_TOKEN=sign_flow('menu', {'menu_id': self.menu.id}))
 
         self.valid_data = {
             "items": [
@@ -123,9 +128,7 @@ class TestAddMenuItem(APITestCase):
 
     def test_expired_session(self):
         self.client.force_authenticate(user=self.user)
-        session = self.client.session
-        del session['menu_id']
-        session.save()
+        self.client.credentials()
 
         response = self.client.post(self.url, data=self.valid_data, format='json')
         self.assertEqual(response.status_code, status.HTTP_308_PERMANENT_REDIRECT)
@@ -146,14 +149,24 @@ class TestReceiveQRimage(APITestCase):
                                           description=' a menu for test',
                                           user=self.user)
     def test_success_get_qrcode(self):
-        session = self.client.session
-        session['menu_id'] = self.menu.id
-        session.save()
+        self.client.credentials(HTTP_X_FLOW_TOKEN=sign_flow('menu', {'menu_id': self.menu.id}))
 
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['qr_status'], QRMenu.QR_PENDING)
+        self.assertIsNone(response.data['image'])
 
 
+    def test_other_users_menu(self):
+        other_user = User.objects.create_user(username='otheruser',
+                                              phone_number='0222222222',
+                                              password='1234')
+        self.client.force_authenticate(user=other_user)
+        self.client.credentials(HTTP_X_FLOW_TOKEN=sign_flow('menu', {'menu_id': self.menu.id}))
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_not_fount_menu(self):
 
         response = self.client.get(self.url)
@@ -164,6 +177,7 @@ class TestFetchMenu(APITestCase):
 
     def setUp(self):
         self.client = APIClient()
+        caches['menu'].clear()
         
 
         user = User.objects.create_user(username='testuser',
@@ -191,12 +205,74 @@ class TestFetchMenu(APITestCase):
         response = self.client.get(self.url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data['menu']['title'], self.menu.title)
-        self.assertEqual(response.data['menu']['id'], self.menu.id)
+        self.assertEqual(response.json()['menu']['title'], self.menu.title)
+        self.assertEqual(response.json()['menu']['id'], self.menu.id)
+        self.assertIn('ETag', response)
 
-        items = response.data['items']
+        items = response.json()['items']
         self.assertEqual(len(items), 2)
 
+    def test_not_modified_fetch_menu(self):
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_not_found_fetch_menu(self):
+        response = self.client.get(reverse('home:fetch_menu', args=[9999]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_fetch_menu_single_query(self):
+        MenuItem.objects.filter(id=self.item2.id).update(available=False)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.json()['items'], [{
+            'id': self.item1.id,
+            'item': self.item1.item,
+            'description': self.item1.description,
+            'price': self.item1.price,
+        }])
+        self.assertEqual(response.json()['menu'], {
+            'id': self.menu.id,
+            'title': self.menu.title,
+            'description': self.menu.description,
+        })
+
+    def test_fetch_menu_without_items(self):
+        MenuItem.objects.filter(menu=self.menu).delete()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['items'], [])
+
+    def test_cached_fetch_menu(self):
+        self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['items']), 2)
+
+    def test_write_invalidates_fetch_menu(self):
+        etag = self.client.get(self.url)['ETag']
+
+        self.client.force_authenticate(user=self.menu.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('home:add_item', args=[self.menu.id]),
+                             data={'item':'Salad', 'description':'Green salad', 'price':800},
+                             format='json')
+        self.client.force_authenticate(user=None)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['items']), 3)
+
 
 class TestRemoveItem(APITestCase):
 
@@ -380,11 +456,48 @@ class TestViewSet(APITestCase):
     def test_list_viewset(self):
         self.client.force_authenticate(user=self.user)
         response = self.client.get(self.list_url)
-        menus = QRMenu.objects.filter(user=self.user).all()
+        menus = QRMenu.objects.filter(user=self.user).order_by('-created_at', '-id')
         serz_data = QRMenuSerializer(menus, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serz_data.data)
+        self.assertEqual(response.data['results'], serz_data.data)
+        self.assertIsNone(response.data['next'])
+
+    def test_list_viewset_pagination(self):
+        self.client.force_authenticate(user=self.user)
+        for number in range(3):
+            QRMenu.objects.create(title=f'menu {number}', user=self.user)
+        expected = list(QRMenu.objects.filter(user=self.user)
+                        .order_by('-created_at', '-id').values_list('id', flat=True))
+
+        seen = []
+        url = f'{self.list_url}?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen += [menu['id'] for menu in response.data['results']]
+            url = response.data['next']
+
+        self.assertEqual(seen, expected)
+
+    def test_list_viewset_fields_and_counts(self):
+        self.client.force_authenticate(user=self.user)
+        MenuItem.objects.create(menu=self.menu1, item='Pizza', description='Cheese', price=10)
+
+        response = self.client.get(self.list_url, {'fields': 'id,item_count'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        counts = {menu['id']: menu['item_count'] for menu in response.data['results']}
+        self.assertEqual(counts, {self.menu1.id: 1, self.menu2.id: 0})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'item_count'})
+
+    def test_list_viewset_invalid_params(self):
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.list_url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(self.list_url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
     def test_retrieve_viewset(self):
         self.client.force_authenticate(user=self.user)
@@ -410,4 +523,229 @@ class TestViewSet(APITestCase):
         response = self.client.delete(self.destroy_url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertFalse(QRMenu.objects.filter(id=self.menu1.id).exists())
\ No newline at end of file
+        self.assertFalse(QRMenu.objects.filter(id=self.menu1.id).exists())
+
+
+class TestDestroyMenuEviction(APITransactionTestCase):
+    # Without a test transaction, on_commit callbacks run immediately as in production.
+
+    def setUp(self):
+        caches['menu'].clear()
+        for task in ('render_qr_code_task', 'delete_objects_task', 'publish_menu_task'):
+            patcher = patch(f'menu.tasks.{task}.delay')
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user(username='testuser',
+                                             phone_number='011111111',
+                                             password='1234')
+        self.menu = QRMenu.objects.create(title='the menu', user=self.user)
+
+    def test_destroy_evicts_public_menu(self):
+        fetch_url = reverse('home:fetch_menu', args=[self.menu.id])
+        self.assertEqual(self.client.get(fetch_url).status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.delete(reverse('home:menu-detail', args=[self.menu.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.force_authenticate(user=None)
+
+        self.assertEqual(self.client.get(fetch_url).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TestImportItems(APITestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser',
+                                             phone_number='011111111',
+                                             password='1234')
+        self.other_user = User.objects.create_user(username='otheruser',
+                                                   phone_number='0222222222',
+                                                   password='1234')
+        self.menu = QRMenu.objects.create(title='the menu',
+                                          description=' a menu for test',
+                                          user=self.user)
+        self.url = reverse('home:import_items', args=[self.menu.id])
+        self.client.force_authenticate(user=self.user)
+
+    def test_import_ndjson(self):
+        body = '\n'.join(json.dumps({'item': f'Item {i}', 'description': 'Imported', 'price': i})
+                         for i in range(25))
+        response = self.client.post(f'{self.url}?batch_size=10', data=body,
+                                    content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 25)
+        self.assertEqual(response.data['error_count'], 0)
+        self.assertEqual(MenuItem.objects.filter(menu=self.menu).count(), 25)
+
+    def test_import_csv_reports_row_errors(self):
+        body = ('item,description,price\n'
+                'Pizza,Cheese pizza,1500\n'
+                ',No name,100\n'
+                'Pasta,Creamy pasta,not-a-price\n'
+                'Salad,Green salad,800\n')
+        response = self.client.post(self.url, data=body, content_type='text/csv')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['error_count'], 2)
+        self.assertEqual([error['line'] for error in response.data['errors']], [3, 4])
+        self.assertEqual(set(MenuItem.objects.values_list('item', flat=True)), {'Pizza', 'Salad'})
+
+    def test_import_malformed_ndjson_line(self):
+        body = '{"item": "Pizza", "description": "Cheese", "price": 10}\n{not json\n'
+        response = self.client.post(self.url, data=body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'], [{'line': 2, 'errors': 'malformed row'}])
+
+    def test_import_undecodable_lines(self):
+        body = (b'{"item": "Pizza", "description": "Cheese", "price": 10}\n'
+                b'{"item": "Caf\xe9", "description": "Latin-1", "price": 5}\n')
+        response = self.client.post(self.url, data=body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'], [{'line': 2, 'errors': 'malformed row'}])
+
+        body = b'item,description,price\nCaf\xe9,Latin-1,5\nSalad,Green salad,800\n'
+        response = self.client.post(self.url, data=body, content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'], [{'line': 2, 'errors': 'malformed row'}])
+
+    def test_import_invalid_batch_size(self):
+        for batch_size in ('-5', '0', 'ten'):
+            response = self.client.post(f'{self.url}?batch_size={batch_size}',
+                                        data='item,description,price\nPizza,Cheese,10\n',
+                                        content_type='text/csv')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(MenuItem.objects.filter(menu=self.menu).exists())
+
+    def test_import_unsupported_format(self):
+        response = self.client.post(self.url, data={'items': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    def test_unauthrized_import(self):
+        self.client.force_authenticate(user=self.other_user)
+        response = self.client.post(self.url, data='item,description,price\n',
+                                    content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+
+class TestBulkItemChanges(APITestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser',
+                                             phone_number='011111111',
+                                             password='1234')
+        self.other_user = User.objects.create_user(username='otheruser',
+                                                   phone_number='0222222222',
+                                                   password='1234')
+        self.menu = QRMenu.objects.create(title='the menu',
+                                          description=' a menu for test',
+                                          user=self.user)
+        self.other_menu = QRMenu.objects.create(title='other menu',
+                                                description='not yours',
+                                                user=self.other_user)
+        self.pizza = MenuItem.objects.create(menu=self.menu, item='Pizza',
+                                             description='Cheese pizza', price=1500)
+        self.pasta = MenuItem.objects.create(menu=self.menu, item='Pasta',
+                                             description='Creamy pasta', price=1200)
+        self.foreign = MenuItem.objects.create(menu=self.other_menu, item='Soup',
+                                               description='Hot soup', price=500)
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_update_items(self):
+        data = {'items': [{'id': self.pizza.id, 'price': 1600},
+                          {'id': self.pasta.id, 'price': 1300, 'available': False},
+                          {'id': self.foreign.id, 'price': 1}]}
+        response = self.client.patch(reverse('home:bulk_update_items', args=[self.menu.id]),
+                                     data=data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 2)
+        self.pizza.refresh_from_db()
+        self.pasta.refresh_from_db()
+        self.foreign.refresh_from_db()
+        self.assertEqual((self.pizza.price, self.pizza.available), (1600, True))
+        self.assertEqual((self.pasta.price, self.pasta.available), (1300, False))
+        self.assertEqual(self.pasta.description, 'Creamy pasta')
+        self.assertEqual(self.foreign.price, 500)
+
+    def test_bulk_update_duplicate_ids(self):
+        data = {'items': [{'id': self.pizza.id, 'price': 1}, {'id': self.pizza.id, 'price': 2}]}
+        response = self.client.patch(reverse('home:bulk_update_items', args=[self.menu.id]),
+                                     data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unauthrized_bulk_update(self):
+        response = self.client.patch(reverse('home:bulk_update_items', args=[self.other_menu.id]),
+                                     data={'items': [{'id': self.foreign.id, 'price': 1}]},
+                                     format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_upsert_items(self):
+        data = {'items': [{'item': 'Pizza', 'price': 1700},
+                          {'item': 'Salad', 'price': 800, 'description': 'Green salad'},
+                          {'item': 'Soup', 'price': 600}]}
+        response = self.client.put(reverse('home:upsert_items', args=[self.menu.id]),
+                                   data=data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'updated': 1, 'created': 2})
+        self.pizza.refresh_from_db()
+        self.assertEqual((self.pizza.price, self.pizza.description), (1700, 'Cheese pizza'))
+        self.assertEqual(dict(MenuItem.objects.filter(menu=self.menu).values_list('item', 'price')),
+                         {'Pizza': 1700, 'Pasta': 1200, 'Salad': 800, 'Soup': 600})
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.foreign.price, 500)
+
+    def test_upsert_invalid_row(self):
+        response = self.client.put(reverse('home:upsert_items', args=[self.menu.id]),
+                                   data={'items': [{'item': 'Pizza'}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_toggle_availability_by_name(self):
+        second_menu = QRMenu.objects.create(title='second menu', description='', user=self.user)
+        salad = MenuItem.objects.create(menu=second_menu, item='Pizza salad',
+                                        description='Salad', price=900)
+        other_pizza = MenuItem.objects.create(menu=self.other_menu, item='Pizza',
+                                              description='Not yours', price=1000)
+        versions = {menu_id: menu_cache.get_version(menu_id)
+                    for menu_id in (self.menu.id, second_menu.id)}
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(reverse('home:item_availability'),
+                                         data={'available': False, 'name': 'pizza'},
+                                         format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(set(response.data['menus']), {self.menu.id, second_menu.id})
+        self.assertEqual(set(MenuItem.objects.filter(available=False).values_list('id', flat=True)),
+                         {self.pizza.id, salad.id})
+        other_pizza.refresh_from_db()
+        self.assertTrue(other_pizza.available)
+        for menu_id, version in versions.items():
+            self.assertNotEqual(menu_cache.get_version(menu_id), version)
+
+    def test_toggle_availability_by_ids_and_menus(self):
+        data = {'available': False, 'ids': [self.pizza.id, self.pasta.id, self.foreign.id],
+                'menus': [self.menu.id]}
+        response = self.client.patch(reverse('home:item_availability'), data=data, format='json')
+        self.assertEqual(response.data, {'updated': 2, 'menus': [self.menu.id]})
+        self.foreign.refresh_from_db()
+        self.assertTrue(self.foreign.available)
+
+        # Items already in the requested state are not touched again.
+        response = self.client.patch(reverse('home:item_availability'), data=data, format='json')
+        self.assertEqual(response.data, {'updated': 0, 'menus': []})
+
+    def test_toggle_availability_requires_selector(self):
+        response = self.client.patch(reverse('home:item_availability'),
+                                     data={'available': False}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -11,6 +11,10 @@ urlpatterns = [
     path('item/delete/<int:item_id>', views.RemoveItemView.as_view(), name='remove_item'),
     path('item/update/<int:item_id>/', views.UpdateItemView.as_view(), name='update_item'),
     path('item/add/<int:menu_id>/', views.AddItemView.as_view(), name='add_item'),
+    path('item/import/<int:menu_id>/', views.ImportItemsView.as_view(), name='import_items'),
+    path('item/bulk_update/<int:menu_id>/', views.BulkUpdateItemsView.as_view(), name='bulk_update_items'),
+    path('item/upsert/<int:menu_id>/', views.UpsertItemsView.as_view(), name='upsert_items'),
+    path('item/availability/', views.ItemAvailabilityView.as_view(), name='item_availability'),
 ]
 
 router = routers.SimpleRouter()
@@ -1,13 +1,24 @@
+from io import BytesIO
+from django.conf import settings
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from .models import QRMenu, MenuItem
-from .serializers import BulckSerializerMenuItem, QRMenuSerializer, MenuItemSerializer
+from django.db.models import Count
+from .serializers import BulckSerializerMenuItem, QRMenuSerializer, MenuItemSerializer, QRMenuListSerializer
+from .serializers import BulkItemUpdateSerializer, BulkItemUpsertSerializer, ItemAvailabilitySerializer
+from . import services
+from .pagination import KeysetPagination
+from .imports import UnsupportedImportFormat, iter_rows, import_menu_items
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from throttling import ManagementRateThrottle, ScanRateThrottle
 from rest_framework import status, viewsets
 from .models import QRMenu
-from . import tasks
+from .documents import get_menu_document, menu_changed, menus_changed
+from accounts.flows import sign_flow, read_flow
 
 
 class CreateMenuView(APIView):
@@ -16,7 +27,8 @@ class CreateMenuView(APIView):
 
     This class provides functionality for authenticated users to create a new QR menu associated with their account. 
     It accepts menu details (title and description) in the request, validates the input, and saves the menu to the database.
-    The created menu ID is stored in the user's session for future reference.
+    The created menu ID is signed into a `flow_token` returned with the menu, to be sent back
+    in the `X-Flow-Token` header when adding items and fetching the QR image.
 
     Permissions:
         - IsAuthenticated: Only authenticated users can access this endpoint.
@@ -29,6 +41,7 @@ class CreateMenuView(APIView):
         - 400 Bad Request: Validation failed due to invalid input data.
     """
     permission_classes = [IsAuthenticated]
+    throttle_classes = [ManagementRateThrottle]
 
     def post(self, request):
         serz_data = QRMenuSerializer(data=request.data)
@@ -40,8 +53,11 @@ class CreateMenuView(APIView):
                 description = serz_data.validated_data['description'],
                 user=user
             )
-            request.session['menu_id'] = menu.id
-            return Response(QRMenuSerializer(menu).data, status=status.HTTP_201_CREATED)
+            # Publishes the menu right away, as its QR code may point at the snapshot.
+            menu_changed(menu.id)
+            data = QRMenuSerializer(menu).data
+            data['flow_token'] = sign_flow('menu', {'menu_id': menu.id})
+            return Response(data, status=status.HTTP_201_CREATED)
         
         return Response({'errors': serz_data.errors, 'message': 'Validation failed.'}, status=status.HTTP_400_BAD_REQUEST)
     
@@ -52,9 +68,9 @@ class AddMenuItemView(APIView):
     API endpoint for adding items to a menu.
 
     This view allows authenticated users to add multiple items to a QR menu.
-    The menu must exist in the user's session and belong to the authenticated user. 
-    Bulk item creation is performed using the `BulckSerializerMenuItem`. If the 
-    session has expired, the user is redirected to the menu creation page.
+    The menu is identified by the flow token returned by `CreateMenuView` and must belong to
+    the authenticated user. Bulk item creation is performed using the `BulckSerializerMenuItem`.
+    If the flow token has expired, the user is redirected to the menu creation page.
 
     Permissions:
         - IsAuthenticated: Only authenticated users can access this endpoint.
@@ -63,7 +79,7 @@ class AddMenuItemView(APIView):
         - POST: Adds items to a menu.
 
     Behavior:
-        1. Checks the session for the `menu_id`.
+        1. Reads the `menu_id` from the flow token in the `X-Flow-Token` header.
         2. Validates that the menu belongs to the authenticated user.
         3. Uses the `BulckSerializerMenuItem` for bulk creation of menu items.
         4. Responds with a success message upon successful creation or error details upon failure.
@@ -72,20 +88,22 @@ class AddMenuItemView(APIView):
         - 201 Created: Items were successfully added to the menu.
         - 400 Bad Request: Validation errors occurred while processing the input.
         - 403 Forbidden: The authenticated user does not have permission to modify the menu.
-        - 308 Permanent Redirect: The user's session has expired and they need to create a new menu.
+        - 308 Permanent Redirect: The flow token is missing or expired and they need to create a new menu.
     """
     permission_classes = [IsAuthenticated]
+    throttle_classes = [ManagementRateThrottle]
 
     def post(self, request):
-        menu_id = request.session.get('menu_id')
-        if menu_id:
-            menu = get_object_or_404(QRMenu, id=menu_id)
-            if menu.user == request.user:
+        flow = read_flow(request, 'menu', max_age=settings.MENU_FLOW_TOKEN_MAX_AGE)
+        if flow:
+            menu = get_object_or_404(QRMenu.objects.only('id', 'user_id'), id=flow['menu_id'])
+            if menu.user_id == request.user.id:
                         
                 serz_data = BulckSerializerMenuItem(data=request.data,
                                             context={'menu':menu, 'request':request})
                 if serz_data.is_valid():
                     serz_data.save()
+                    menu_changed(menu.id)
                     
                     return Response({'message':'items saved'}, status=status.HTTP_201_CREATED)
                 return Response(serz_data.errors, status=status.HTTP_400_BAD_REQUEST) 
@@ -103,9 +121,9 @@ class ReceiveQRimage(APIView):
     API endpoint for retrieving the QR menu image and its details.
 
     This view allows authenticated users to retrieve the details and QR code image 
-    of a menu stored in the user's session. Once the menu data is retrieved, the 
-    session entry for the menu ID is deleted. If the session has expired or the menu 
-    ID is not found, the user is redirected to the menu creation page.
+    of the menu identified by the flow token returned by `CreateMenuView`, sent in the
+    `X-Flow-Token` header. If the flow token has expired or is missing, the user is
+    redirected to the menu creation page.
 
     Permissions:
         - IsAuthenticated: Only authenticated users can access this endpoint.
@@ -113,22 +131,27 @@ class ReceiveQRimage(APIView):
     HTTP Methods:
         - GET: Fetches menu details and QR code image.
 
+    The QR image is rendered in the background after the menu is created, so `image` is
+    `null` and `qr_status` is `pending` until the render task has uploaded it.
+
     Responses:
-        - 200 OK: Returns the menu details and QR code image URL if the session ID is valid.
-        - 404 Not Found: Indicates that the session has expired and provides a redirect link to create a new menu.
+        - 200 OK: Returns the menu details, QR code image URL and `qr_status` if the flow token is valid.
+        - 404 Not Found: Indicates that the flow token has expired and provides a redirect link to create a
+          new menu, or that the menu does not belong to the user.
     """
     permission_classes = [IsAuthenticated]
+    throttle_classes = [ManagementRateThrottle]
 
     def get(self, request):
-        session_id = request.session.get('menu_id')
-        if session_id:
-            menu = QRMenu.objects.get(id=session_id)
+        flow = read_flow(request, 'menu', max_age=settings.MENU_FLOW_TOKEN_MAX_AGE)
+        if flow:
+            menu = get_object_or_404(QRMenu, id=flow['menu_id'], user_id=request.user.id)
         
             serz_data = QRMenuSerializer(menu)
-            qr_image = menu.qr_code
-            del request.session['menu_id']
+            qr_image = menu.qr_code.url if menu.qr_code else None
             return Response({'data':serz_data.data, 
-                            'image':qr_image.url}, status=status.HTTP_200_OK)
+                            'image':qr_image,
+                            'qr_status':menu.qr_status}, status=status.HTTP_200_OK)
         
         redirect_url = reverse('home:create_menu')
         return Response({'detail':'session has been expired', 'redirect link':redirect_url}
@@ -141,8 +164,11 @@ class FetchMenu(APIView):
     API endpoint for fetching menu details and its items.
 
     This view allows any user (authenticated or unauthenticated) to retrieve the details of a 
-    specific menu along with all items associated with that menu. The menu and items are serialized 
-    into JSON format using the `QRMenuSerializer` and `MenuItemSerializer`, respectively.
+    specific menu along with its available items. The menu and items are fetched in a single
+    query and serialized into JSON bytes with the same fields as `QRMenuSerializer` and
+    `MenuItemSerializer`; the resulting document and its ETag are kept in the menu cache and
+    re-materialized whenever one of the write endpoints changes the menu. Clients can
+    revalidate with `If-None-Match`.
 
     Permissions:
         - AllowAny: This endpoint is accessible to all users, regardless of authentication status.
@@ -154,29 +180,30 @@ class FetchMenu(APIView):
         menu_id (int): The primary key of the menu to fetch.
 
     Behavior:
-        1. Retrieves the menu instance using `menu_id`.
-        2. Serializes the menu and its associated items using the appropriate serializers.
-        3. Returns the serialized data in the response.
+        1. Looks up the cached document for `menu_id` and the menu's current cache version.
+        2. On a miss, fetches the menu and its available items in one query and caches the result.
+        3. Returns 304 if `If-None-Match` matches the document's ETag, otherwise the stored bytes.
 
     Responses:
         - 200 OK: Successfully fetched the menu details and items.
+        - 304 Not Modified: The client's copy (per `If-None-Match`) is current.
         - 404 Not Found: The menu does not exist.
+        - 429 Too Many Requests: The menu's `scan` rate is exhausted. It is counted per
+          menu, not per diner, and allows bursts of `THROTTLE_BURSTS['scan']` requests.
     """
     permission_classes = [AllowAny]
+    throttle_classes = [ScanRateThrottle]
 
     def get(self ,request, menu_id):
-        menu = get_object_or_404(QRMenu, id=menu_id)
-        serz_menu = QRMenuSerializer(menu)
-        serz_menu = serz_menu.data
-
-        items = MenuItem.objects.filter(menu=menu)
-        items_serializer = MenuItemSerializer(items, many=True)
-        items = items_serializer.data
+        document = get_menu_document(menu_id)
 
-        return Response({
-            'menu':serz_menu,
-            'items':items
-        }, status=status.HTTP_200_OK)
+        response = get_conditional_response(request, etag=document.etag)
+        if response is None:
+            response = HttpResponse(document.body, content_type='application/json',
+                                    status=status.HTTP_200_OK)
+        response['ETag'] = document.etag
+        response['Cache-Control'] = 'no-cache'
+        return response
 
 
 
@@ -193,63 +220,80 @@ class MenuViewSet(viewsets.ViewSet):
         - IsAuthenticated: Only logged-in users can access this ViewSet.
 
     HTTP Methods:
-        - GET (list): Retrieves all menus owned by the authenticated user.
+        - GET (list): Retrieves the menus owned by the authenticated user, one page at a time.
         - GET (retrieve): Fetches the details of a specific menu and its QR code.
         - PATCH (partial_update): Partially updates the details of a specific menu.
         - DELETE (destroy): Deletes a specific menu.
 
     Methods:
         list(request):
-            Retrieves a list of all menus associated with the authenticated user.
+            Retrieves the menus associated with the authenticated user, newest first, with
+            keyset pagination on `(created_at, id)`: follow `next` (or pass `cursor`) to get
+            the following page and `page_size` to change its length. `fields` selects a
+            comma-separated subset of `id, title, description, available, qr_status,
+            created_at, item_count`; `item_count` is computed with a single aggregate.
 
         retrieve(request, pk):
             Retrieves the details of a specific menu identified by its primary key, 
-            along with the QR code image URL.
+            along with the QR code image URL and its `qr_status` (`pending` while the
+            image is being rendered).
 
         partial_update(request, pk):
             Partially updates the details of a specific menu, provided it belongs to 
-            the authenticated user. Also deletes and regenerates the associated QR code.
+            the authenticated user. The QR code is regenerated in the background and
+            the previous image is removed by the render task.
 
         destroy(request, pk):
             Deletes a specific menu if it belongs to the authenticated user.
 
     Responses:
         - 200 OK: Successfully retrieves or updates a menu.
-        - 400 Bad Request: Validation errors occurred during the update.
+        - 400 Bad Request: Validation errors occurred during the update, or unknown `fields`.
         - 403 Forbidden: The user does not have permission to access or modify the menu.
         - 404 Not Found: The menu does not exist.
     """
     permission_classes = [IsAuthenticated]
+    throttle_classes = [ManagementRateThrottle]
     queryset = QRMenu.objects.all()
 
 
     def list(self ,request):
 
-        user = request.user
-        menus = self.queryset.filter(user=user)
-        serz_data = QRMenuSerializer(instance=menus, many=True)
-        return Response(serz_data.data, status=status.HTTP_200_OK)
+        fields = [field for field in request.query_params.get('fields', '').split(',') if field]
+        unknown = set(fields) - set(QRMenuListSerializer.Meta.fields)
+        if unknown:
+            return Response({'fields':f"unknown fields: {', '.join(sorted(unknown))}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        menus = QRMenu.objects.owned_by(request.user)
+        if 'item_count' in fields:
+            menus = menus.annotate(item_count=Count('items'))
+
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(menus, request, view=self)
+        serz_data = QRMenuListSerializer(instance=page, many=True, fields=fields)
+        return paginator.get_paginated_response(serz_data.data)
 
 
     def retrieve(self, request, pk=None):
      
         menu = get_object_or_404(QRMenu, id=pk)
         serz_data = QRMenuSerializer(instance=menu)
-        qr_image = menu.qr_code.url
+        qr_image = menu.qr_code.url if menu.qr_code else None
         return Response({'data':serz_data.data,
-                         'image':qr_image}, status=status.HTTP_200_OK)
+                         'image':qr_image,
+                         'qr_status':menu.qr_status}, status=status.HTTP_200_OK)
 
 
     def partial_update(self, request, pk):
     
         menu = get_object_or_404(QRMenu, id=pk)
-        if menu.user == request.user:
+        if menu.user_id == request.user.id:
 
             serz_data = QRMenuSerializer(instance=menu, data=request.data, partial=True)
             if serz_data.is_valid():
-                qr_image = str(menu.qr_code)
-                tasks.delete_object_tasks(qr_image)
                 serz_data.save()
+                menu_changed(menu.id)
                 return Response(serz_data.data, status=status.HTTP_200_OK)
             
             return Response(serz_data.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -261,7 +305,11 @@ class MenuViewSet(viewsets.ViewSet):
      
         menu = get_object_or_404(QRMenu, id=pk, user=request.user)
         if menu:
-            menu.delete()  
+            menu_id = menu.id
+            menu.delete()
+            # Only invalidate: a refresh would rebuild the deleted menu. Republishing
+            # finds it gone and removes its snapshot.
+            menus_changed([menu_id])
             return Response({'message':'Menu has been deleted'}, status=status.HTTP_200_OK)
         return Response({'message':'menu dose not exist'}, status=status.HTTP_400_BAD_REQUEST)
      
@@ -283,7 +331,7 @@ class RemoveItemView(APIView):
         - DELETE: Deletes a specific menu item.
 
     Behavior:
-        1. Checks if the item exists using its ID.
+        1. Loads the item together with its menu's owner id in a single query.
         2. Verifies that the requesting user is the owner of the menu associated with the item.
         3. Deletes the item if the user has permission.
 
@@ -294,16 +342,17 @@ class RemoveItemView(APIView):
     """
 
     permission_classes = [IsAuthenticated]
+    throttle_classes = [ManagementRateThrottle]
 
     def delete(self, request, item_id):
         try:    
-            item = MenuItem.objects.get(id=item_id)
+            item = MenuItem.objects.with_owner().get(id=item_id)
         except MenuItem.DoesNotExist:
             return Response({'message':'Item not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        menu = item.menu
-        if menu.user == request.user:
+        if item.owner_id == request.user.id:
             item.delete()
+            menu_changed(item.menu_id)
         
             return Response({'message':'Item has been deleted'}, status=status.HTTP_200_OK)
 
@@ -326,7 +375,7 @@ class UpdateItemView(APIView):
         - PATCH: Partially updates the specified menu item.
 
     Behavior:
-        1. Checks if the item exists using the provided `item_id`.
+        1. Loads the item together with its menu's owner id in a single query.
         2. Verifies that the requesting user is the owner of the menu associated with the item.
         3. Validates the input data using the `MenuItemSerializer`.
         4. Saves the updated data if validation is successful.
@@ -338,19 +387,20 @@ class UpdateItemView(APIView):
         - 404 Not Found: The item does not exist.
     """
     permission_classes = [IsAuthenticated]
+    throttle_classes = [ManagementRateThrottle]
 
     def patch(self, request, item_id):
         
         try:
-            item = MenuItem.objects.get(id=item_id)
+            item = MenuItem.objects.with_owner().get(id=item_id)
         except MenuItem.DoesNotExist:
             return Response({'message':'item does not exist'}, status=status.HTTP_404_NOT_FOUND)
 
-        menu = item.menu
-        if menu.user == request.user:
+        if item.owner_id == request.user.id:
             serz_data = MenuItemSerializer(instance=item, data=request.data, partial=True)
             if serz_data.is_valid():
                 serz_data.save()
+                menu_changed(item.menu_id)
                 return Response(serz_data.data, status=status.HTTP_200_OK)
 
             return Response(serz_data.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -387,19 +437,206 @@ class AddItemView(APIView):
         - 404 Not Found: The specified menu does not exist.
     """
     permission_classes = [IsAuthenticated]
+    throttle_classes = [ManagementRateThrottle]
 
     def post(self ,request, menu_id):
-        menu = get_object_or_404(QRMenu, id=menu_id)
-        if menu.user == request.user:
+        menu = get_object_or_404(QRMenu.objects.only('id', 'user_id'), id=menu_id)
+        if menu.user_id == request.user.id:
 
             serz_data = MenuItemSerializer(data=request.data, context={'menu':menu})
             
             if serz_data.is_valid():
                 serz_data.save()
+                menu_changed(menu.id)
                 return Response(serz_data.data, status=status.HTTP_201_CREATED)
             
             return Response(serz_data.errors, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({'message': 'You do not have permission to modify this menu.'}, status=status.HTTP_403_FORBIDDEN)
-    
 
+
+
+class ImportItemsView(APIView):
+    """
+    API endpoint for importing a large catalog of items into a menu.
+
+    This view streams the request body instead of parsing it up front: rows are read and
+    validated one at a time with the `MenuItemSerializer` rules and written with
+    `bulk_create` in chunks inside a single transaction, so worker memory stays flat
+    however many rows are sent. Invalid rows are skipped and reported by line number.
+
+    Permissions:
+        - IsAuthenticated: Only logged-in users can access this endpoint.
+
+    HTTP Methods:
+        - POST: Imports the rows of the request body into the menu.
+
+    Request Body:
+        - `application/x-ndjson`: one JSON object per line with `item`, `description` and `price`.
+        - `text/csv`: a header row with `item,description,price` followed by one row per item.
+
+    Query Parameters:
+        - batch_size (int, optional): Rows per INSERT, defaults to `MENU_IMPORT_BATCH_SIZE` and
+          is capped at `MENU_IMPORT_MAX_BATCH_SIZE`.
+
+    Responses:
+        - 201 Created: `created` rows were imported; `errors` lists rejected rows (capped at
+          `MENU_IMPORT_MAX_ERRORS`) and `error_count` how many there were in total.
+        - 400 Bad Request: `batch_size` is not a positive integer.
+        - 403 Forbidden: The user does not have permission to modify the menu.
+        - 404 Not Found: The specified menu does not exist.
+        - 415 Unsupported Media Type: The body is neither NDJSON nor CSV.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [ManagementRateThrottle]
+
+    def post(self, request, menu_id):
+        menu = get_object_or_404(QRMenu.objects.only('id', 'user_id'), id=menu_id)
+        if menu.user_id != request.user.id:
+            return Response({'message': 'You do not have permission to modify this menu.'},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        batch_size = request.query_params.get('batch_size')
+        if batch_size is not None:
+            if not batch_size.isdigit() or int(batch_size) < 1:
+                return Response({'batch_size': 'must be a positive integer'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            batch_size = min(int(batch_size), settings.MENU_IMPORT_MAX_BATCH_SIZE)
+
+        try:
+            rows = iter_rows(request.stream or BytesIO(), request.content_type)
+            result = import_menu_items(menu, rows, batch_size=batch_size)
+        except UnsupportedImportFormat:
+            return Response({'message': 'Send the items as application/x-ndjson or text/csv.'},
+                            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+        if result['created']:
+            menu_changed(menu.id)
+        return Response(result, status=status.HTTP_201_CREATED)
+
+
+
+class BulkUpdateItemsView(APIView):
+    """
+    API endpoint for updating many items of a menu in one request, e.g. price changes.
+
+    Each entry names an item `id` and the fields to change (`item`, `description`, `price`,
+    `available`). Entries are applied with `bulk_update`, one UPDATE statement per batch
+    and per set of changed fields, instead of one request and three queries per item.
+    Ids that do not belong to the menu are ignored.
+
+    Permissions:
+        - IsAuthenticated: Only logged-in users can access this endpoint.
+
+    HTTP Methods:
+        - PATCH: Applies the changes.
+
+    Expected Request Format:
+        {"items": [{"id": 1, "price": 1200}, {"id": 2, "available": false}]}
+
+    Responses:
+        - 200 OK: `{"updated": <rows updated>}`.
+        - 400 Bad Request: Validation errors occurred while processing the input.
+        - 403 Forbidden: The user does not have permission to modify the menu.
+        - 404 Not Found: The specified menu does not exist.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [ManagementRateThrottle]
+
+    def patch(self, request, menu_id):
+        menu = get_object_or_404(QRMenu.objects.only('id', 'user_id'), id=menu_id)
+        if menu.user_id != request.user.id:
+            return Response({'message': 'You do not have permission to modify this menu.'},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        serz_data = BulkItemUpdateSerializer(data=request.data)
+        if serz_data.is_valid():
+            updated = services.bulk_update_items(menu, serz_data.validated_data['items'])
+            if updated:
+                menu_changed(menu.id)
+            return Response({'updated': updated}, status=status.HTTP_200_OK)
+
+        return Response(serz_data.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+
+class UpsertItemsView(APIView):
+    """
+    API endpoint for synchronizing a menu's items by name, e.g. from a POS system.
+
+    Items whose `item` name already exists in the menu are updated with the given fields;
+    the others are created. The whole sync is a handful of queries regardless of the
+    number of items: one lookup of the existing names, one UPDATE per batch and per set
+    of changed fields, and one INSERT per batch.
+
+    Permissions:
+        - IsAuthenticated: Only logged-in users can access this endpoint.
+
+    HTTP Methods:
+        - PUT: Creates or updates the items.
+
+    Expected Request Format:
+        {"items": [{"item": "Pizza", "price": 1500, "description": "Cheese pizza"}]}
+
+    Responses:
+        - 200 OK: `{"updated": <rows updated>, "created": <rows created>}`.
+        - 400 Bad Request: Validation errors occurred while processing the input.
+        - 403 Forbidden: The user does not have permission to modify the menu.
+        - 404 Not Found: The specified menu does not exist.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [ManagementRateThrottle]
+
+    def put(self, request, menu_id):
+        menu = get_object_or_404(QRMenu.objects.only('id', 'user_id'), id=menu_id)
+        if menu.user_id != request.user.id:
+            return Response({'message': 'You do not have permission to modify this menu.'},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        serz_data = BulkItemUpsertSerializer(data=request.data)
+        if serz_data.is_valid():
+            result = services.upsert_items(menu, serz_data.validated_data['items'])
+            menu_changed(menu.id)
+            return Response(result, status=status.HTTP_200_OK)
+
+        return Response(serz_data.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+
+class ItemAvailabilityView(APIView):
+    """
+    API endpoint for marking many items available or unavailable at once, e.g. when the
+    kitchen runs out of an ingredient during service.
+
+    Items are selected across all menus of the authenticated user by any combination of
+    `ids`, a case-insensitive `name` fragment and `menus`; every given selector must match.
+    The flags are flipped with a single UPDATE and the cached documents of the affected
+    menus are invalidated once the transaction commits.
+
+    Permissions:
+        - IsAuthenticated: Only logged-in users can access this endpoint.
+
+    HTTP Methods:
+        - PATCH: Sets the availability of the selected items.
+
+    Expected Request Format:
+        {"available": false, "name": "mushroom", "menus": [1, 2]}
+
+    Responses:
+        - 200 OK: `{"updated": <rows updated>, "menus": [<ids of the changed menus>]}`.
+        - 400 Bad Request: Validation errors occurred while processing the input.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [ManagementRateThrottle]
+
+    def patch(self, request):
+        serz_data = ItemAvailabilitySerializer(data=request.data)
+        if serz_data.is_valid():
+            data = serz_data.validated_data
+            updated, menu_ids = services.set_items_availability(
+                request.user, data['available'], ids=data.get('ids'),
+                name=data.get('name'), menu_ids=data.get('menus'))
+            menus_changed(menu_ids)
+            return Response({'updated': updated, 'menus': menu_ids}, status=status.HTTP_200_OK)
+
+        return Response(serz_data.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,62 @@
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+
+def purge_expired(model, field, ttl=0, batch_size=None, pause=None, max_batches=None):
+    """
+    Deletes the rows of `model` whose `field` is older than `ttl` seconds, in batches.
+
+    Each batch selects at most `batch_size` primary keys through the index on `field`
+    and removes them with a plain `DELETE ... WHERE pk IN (...)` in its own short
+    transaction. Unlike `QuerySet.delete()` nothing is loaded into memory for signals
+    or cascades, and locks are held for one batch only. `pause` seconds between batches
+    leave room for other writers. Only use it for tables without cascading relations
+    or delete signals that matter, e.g. OTP codes or sessions.
+
+    Returns counters describing the run.
+    """
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    pause = settings.PURGE_BATCH_PAUSE if pause is None else pause
+    cutoff = timezone.now() - timedelta(seconds=ttl)
+
+    using = router.db_for_write(model)
+    connection = connections[using]
+    meta = model._meta
+    delete_sql = 'DELETE FROM {table} WHERE {pk} IN ({placeholders})'
+
+    expired = (model._base_manager.using(using)
+               .filter(**{f'{field}__lt': cutoff})
+               .order_by(field)
+               .values_list('pk', flat=True))
+
+    stats = {'table': meta.db_table, 'purged': 0, 'batches': 0}
+    started = time.monotonic()
+
+    while max_batches is None or stats['batches'] < max_batches:
+        with transaction.atomic(using=using):
+            pks = [meta.pk.get_db_prep_value(pk, connection) for pk in expired[:batch_size]]
+            if not pks:
+                break
+            with connection.cursor() as cursor:
+                cursor.execute(delete_sql.format(table=connection.ops.quote_name(meta.db_table),
+                                                 pk=connection.ops.quote_name(meta.pk.column),
+                                                 placeholders=', '.join(['%s'] * len(pks))),
+                               pks)
+                stats['purged'] += cursor.rowcount
+        stats['batches'] += 1
+
+        if len(pks) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    stats['elapsed'] = round(time.monotonic() - started, 3)
+    logger.info('Purged expired rows: %s', stats)
+    return stats
@@ -0,0 +1,238 @@
+import logging
+import threading
+import time
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+logger = logging.getLogger(__name__)
+
+# GCRA: KEYS[1] holds the theoretical arrival time (TAT) of the next request. A request
+# is allowed when the TAT, pushed back by one interval, stays within `burst` intervals
+# of now. The clock is Redis' own, so app servers with drifting clocks agree.
+GCRA_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then tat = now end
+local new_tat = tat + interval
+local wait = new_tat - interval * tonumber(ARGV[2]) - now
+if wait > 0 then return tostring(wait) end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return '0'
+"""
+
+
+class LocMemThrottleBackend:
+    """
+    GCRA over a dict of this process, for tests and development. `clock` can be replaced
+    to step through time in tests. Entries whose arrival time has passed are pruned once
+    there are more than `max_keys` of them.
+    """
+
+    def __init__(self, clock=time.time, max_keys=10000):
+        self.clock = clock
+        self.max_keys = max_keys
+        self._arrivals = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key, interval, burst):
+        """
+        Records a request for `key` and returns 0, or returns the number of seconds to
+        wait without recording anything when `key` is over its limit.
+        """
+        with self._lock:
+            now = self.clock()
+            tat = max(self._arrivals.get(key, now), now)
+            wait = tat + interval - interval * burst - now
+            if wait > 0:
+                return wait
+            self._arrivals[key] = tat + interval
+            if len(self._arrivals) > self.max_keys:
+                self._arrivals = {name: arrival for name, arrival in self._arrivals.items()
+                                  if arrival > now}
+            return 0
+
+    def clear(self):
+        with self._lock:
+            self._arrivals.clear()
+
+
+class RedisThrottleBackend:
+    """
+    GCRA in Redis, shared by every process. Each request is a single atomic script call
+    storing one key per throttled client, which expires once the client is idle. When
+    Redis cannot be reached requests are let through, so an outage of the limiter does
+    not take the API down with it.
+    """
+
+    def __init__(self, url=None):
+        self.url = url or settings.THROTTLE_REDIS_URL
+        self.prefix = settings.THROTTLE_KEY_PREFIX
+        self._script = None
+
+    @property
+    def script(self):
+        if self._script is None:
+            import redis
+
+            client = redis.Redis.from_url(self.url, socket_timeout=settings.THROTTLE_REDIS_TIMEOUT,
+                                          socket_connect_timeout=settings.THROTTLE_REDIS_TIMEOUT)
+            self._script = client.register_script(GCRA_SCRIPT)
+        return self._script
+
+    def hit(self, key, interval, burst):
+        import redis
+
+        try:
+            return float(self.script(keys=[f'{self.prefix}:{key}'], args=[interval, burst]))
+        except redis.RedisError:
+            logger.warning('Throttle backend unavailable, letting %s through', key, exc_info=True)
+            return 0
+
+    def clear(self):
+        client = self.script.registered_client
+        for key in client.scan_iter(f'{self.prefix}:*'):
+            client.delete(key)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_throttle_backend():
+    """
+    The `THROTTLE_BACKEND` instance of this process.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = import_string(settings.THROTTLE_BACKEND)()
+        return _backend
+
+
+class GCRARateThrottle(BaseThrottle):
+    """
+    Limits requests of a `scope` to its rate in `DEFAULT_THROTTLE_RATES`, e.g. '100/day'.
+
+    Unlike DRF's `SimpleRateThrottle` the limit is enforced with GCRA in the shared
+    throttle backend: one atomic operation per request instead of reading and rewriting
+    a list of timestamps, and the same count in every process. Up to `THROTTLE_BURSTS`
+    requests of the scope (by default the rate's count) can arrive at once, after which
+    they are spaced evenly over the period. Subclasses pick what a request is counted
+    against with `get_cache_key`; `None` leaves the request unthrottled.
+    """
+
+    scope = None
+
+    def __init__(self):
+        self.rate = self.get_rate()
+        self.interval, self.burst = self.parse_rate(self.rate)
+        self._wait = 0
+
+    def get_rate(self):
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured(f"No default throttle rate set for '{self.scope}' scope")
+
+    def parse_rate(self, rate):
+        if rate is None:
+            return None, None
+        num, period = rate.split('/')
+        num = int(num)
+        duration = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+        return duration / num, settings.THROTTLE_BURSTS.get(self.scope, num)
+
+    def get_cache_key(self, request, view):
+        raise NotImplementedError('.get_cache_key() must be overridden')
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+
+        self._wait = get_throttle_backend().hit(f'{self.scope}:{key}', self.interval, self.burst)
+        return not self._wait
+
+    def wait(self):
+        return self._wait
+
+
+class AnonRateThrottle(GCRARateThrottle):
+    """
+    Anonymous requests, per client IP.
+    """
+
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.get_ident(request)
+
+
+class UserRateThrottle(GCRARateThrottle):
+    """
+    Requests per authenticated user, or per client IP for anonymous ones.
+    """
+
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return self.get_ident(request)
+
+
+class ManagementRateThrottle(UserRateThrottle):
+    """
+    Menu management endpoints, per user.
+    """
+
+    scope = 'management'
+
+
+class OTPRateThrottle(GCRARateThrottle):
+    """
+    Endpoints sending an OTP code by SMS, per client IP.
+    """
+
+    scope = 'otp'
+
+    def get_cache_key(self, request, view):
+        return self.get_ident(request)
+
+
+class OTPVerifyRateThrottle(GCRARateThrottle):
+    """
+    Endpoints checking an OTP code, per phone number the code was sent to, so a 4-digit
+    code cannot be guessed from many IPs at once. Views provide the phone number with
+    `get_otp_phone_number(request)`; requests without one are counted per client IP.
+    """
+
+    scope = 'otp_verify'
+
+    def get_cache_key(self, request, view):
+        get_phone_number = getattr(view, 'get_otp_phone_number', None)
+        phone_number = get_phone_number(request) if get_phone_number else None
+        return phone_number or self.get_ident(request)
+
+
+class ScanRateThrottle(GCRARateThrottle):
+    """
+    The public menu endpoint hit when diners scan a QR code, per menu rather than per
+    diner: a full restaurant shares one IP behind its Wi-Fi, while scraping or flooding
+    concentrates on the menus it targets.
+    """
+
+    scope = 'scan'
+
+    def get_cache_key(self, request, view):
+        return view.kwargs.get('menu_id')
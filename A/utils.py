@@ -1,4 +0,0 @@
-
-
-def send_otp_code(phone_number, code):
-    ...
\ No newline at end of file